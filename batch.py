@@ -0,0 +1,119 @@
+""" Headless batch mode: run bulk fixes over many saves at once, no window needed.
+
+python batch.py --ops remove_enemy_units,unlock_all_research --output-dir fixed/ saves/*.sav
+python batch.py --ops remove_all_decryptors --in-place --jobs 8 server_saves/
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import save_model
+import save_ops
+
+def find_saves(paths):
+	""" Expand folders to the .sav files in them, keep files as they are. A save that's named twice is only run once """
+	saves = []
+	seen = set()
+	for path in paths:
+		if os.path.isdir(path):
+			found = sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".sav"))
+		else:
+			found = [path]
+		for file_path in found:
+			key = os.path.normcase(os.path.abspath(file_path))
+			if key not in seen:
+				seen.add(key)
+				saves.append(file_path)
+	return saves
+
+def process_save(file_path, operations, output_path, compact, compresslevel):
+	""" Load one save, run the operations on it and export it. Runs in a worker process """
+	result = {"file": file_path, "output": output_path, "counts": {}, "timings": {}, "error": None}
+	try:
+		start = time.perf_counter()
+		document, _ = save_model.SaveDocument.load(file_path)
+		result["timings"]["load"] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		result["counts"] = document.run_operations(operations)
+		result["timings"]["ops"] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		document.export(output_path, compresslevel=compresslevel, compact=compact)
+		result["timings"]["export"] = time.perf_counter() - start
+	except Exception as e:
+		result["error"] = f"{type(e).__name__}: {e}"
+	result["timings"]["total"] = sum(result["timings"].values())
+	return result
+
+def format_result(result):
+	if result["error"] is not None:
+		return f"FAILED {result['file']}: {result['error']}"
+	counts = ", ".join(f"{operation}={count}" for operation, count in result["counts"].items())
+	timings = " ".join(f"{phase}={seconds * 1000:.0f}ms" for phase, seconds in result["timings"].items())
+	return f"ok {result['file']} | {counts} | {timings}"
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Run VecEdit bulk fixes over many .sav files.")
+	parser.add_argument("saves", nargs="+", help=".sav files or folders of them")
+	parser.add_argument("--ops", required=True, help=f"comma separated, any of: {', '.join(save_ops.OPERATIONS)}")
+	output = parser.add_mutually_exclusive_group(required=True)
+	output.add_argument("--output-dir", help="write fixed saves here, with the same file names")
+	output.add_argument("--in-place", action="store_true", help="overwrite the original saves")
+	parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes (default: CPU count)")
+	parser.add_argument("--pretty", action="store_true", help="indented JSON instead of compact")
+	parser.add_argument("--level", type=int, default=6, choices=range(10), metavar="0-9", help="gzip level (default: 6)")
+	args = parser.parse_args(argv)
+	if args.jobs < 1:
+		parser.error("--jobs has to be at least 1")
+
+	operations = [operation.strip() for operation in args.ops.split(",") if operation.strip()]
+	unknown = [operation for operation in operations if operation not in save_ops.OPERATIONS]
+	if unknown:
+		parser.error(f"unknown operation(s): {', '.join(unknown)}")
+
+	saves = find_saves(args.saves)
+	if not saves:
+		parser.error("no .sav files found")
+	outputs = {}
+	for file_path in saves:
+		output_path = file_path if args.in_place else os.path.join(args.output_dir, os.path.basename(file_path))
+		outputs[file_path] = output_path
+	# Saves from different folders can have the same name, and the last one written would quietly win
+	clashes = {}
+	for file_path, output_path in outputs.items():
+		clashes.setdefault(os.path.normcase(os.path.abspath(output_path)), []).append(file_path)
+	clashes = [file_paths for file_paths in clashes.values() if len(file_paths) > 1]
+	if clashes:
+		parser.error("these saves would be written to the same file: " + "; ".join(", ".join(file_paths) for file_paths in clashes))
+	if args.output_dir:
+		os.makedirs(args.output_dir, exist_ok=True)
+
+	print(f"Running {', '.join(operations)} on {len(saves)} saves with {args.jobs} workers")
+	start = time.perf_counter()
+	results = []
+	with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+		futures = []
+		for file_path, output_path in outputs.items():
+			futures.append(pool.submit(process_save, file_path, operations, output_path, not args.pretty, args.level))
+		for future in as_completed(futures):
+			result = future.result()
+			results.append(result)
+			print(format_result(result))
+	wall_time = time.perf_counter() - start
+
+	failed = [result for result in results if result["error"] is not None]
+	done = [result for result in results if result["error"] is None]
+	print()
+	print(f"{len(done)} saves done, {len(failed)} failed in {wall_time:.2f} s wall time")
+	if done:
+		busy_time = sum(result["timings"]["total"] for result in done)
+		slowest = max(done, key=lambda result: result["timings"]["total"])
+		print(f"Per save: {busy_time / len(done) * 1000:.0f} ms average, slowest {slowest['timings']['total'] * 1000:.0f} ms ({slowest['file']})")
+		for operation in operations:
+			print(f"  {operation}: {sum(result['counts'][operation] for result in done)} changed")
+	return 1 if failed else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,134 @@
+""" Make a synthetic save of any size, shaped like a real one, for benchmarking.
+
+python bench/generate_save.py big.sav --entities 50000 --tiles 100000 --decorations 60000 --regions 2
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import save_io
+from map_grid import MAP_SIZE, TILE_SIZE
+
+TEMPLATE_PATH = os.path.join(REPO_DIR, "com_example_save.sav")
+
+# The first two are real region IDs, any more than that get made up names
+REGION_IDS = ["region_the_abyss", "region_phantom_plains"]
+
+def region_id_for(number):
+	if number < len(REGION_IDS):
+		return REGION_IDS[number]
+	return f"region_bench_{number}"
+
+def template_entities(template_region):
+	return [entity for entities in template_region["entities"].values() for entity in entities]
+
+def remap_ids(value, offset, known_ids):
+	""" Shift every {"ID", "ctx"} reference that points at an entity in this copy, so links stay inside the copy """
+	if isinstance(value, dict):
+		if set(value) == {"ID", "ctx"} and isinstance(value["ID"], int) and value["ID"] in known_ids:
+			value["ID"] += offset
+			return
+		for child in value.values():
+			remap_ids(child, offset, known_ids)
+	elif isinstance(value, list):
+		for child in value:
+			remap_ids(child, offset, known_ids)
+
+def make_entities(template_region, count, rng, first_id):
+	""" count entities copied from the template in whole rounds, each round moved somewhere else on the map and
+	given fresh RuntimeIDs. Returns ({EntityID: [entities]}, next free RuntimeID) """
+	templates = template_entities(template_region)
+	known_ids = {entity["RuntimeID"]["ID"] for entity in templates}
+	id_span = max(known_ids) + 1
+	world_size = MAP_SIZE * TILE_SIZE
+	entities = {}
+	made = 0
+	round_number = 0
+	while made < count:
+		offset = first_id + round_number * id_span
+		# Whole tiles only, so buildings keep their .0/.5 centres
+		shift_x = rng.randrange(MAP_SIZE) * TILE_SIZE if round_number else 0
+		shift_y = rng.randrange(MAP_SIZE) * TILE_SIZE if round_number else 0
+		for template in templates[:count - made]:
+			entity = copy.deepcopy(template)
+			remap_ids(entity, offset, known_ids)
+			entity["PosX"] = (entity["PosX"] + shift_x) % world_size
+			entity["PosY"] = (entity["PosY"] + shift_y) % world_size
+			entities.setdefault(entity["EntityID"], []).append(entity)
+		made += min(len(templates), count - made)
+		round_number += 1
+	return entities, first_id + round_number * id_span
+
+def random_tiles(count, rng):
+	count = min(count, MAP_SIZE * MAP_SIZE)
+	return [(offset % MAP_SIZE, offset // MAP_SIZE) for offset in rng.sample(range(MAP_SIZE * MAP_SIZE), count)]
+
+def make_resources(template_region, count, rng):
+	""" count resource tiles, with each resource as common as it is in the template """
+	kinds = list(template_region["resources"])
+	weights = [len(template_region["resources"][kind]) for kind in kinds]
+	resources = {}
+	for x, y in random_tiles(count, rng):
+		resources.setdefault(rng.choices(kinds, weights)[0], []).append({"X": x, "Y": y})
+	return resources
+
+def make_decorations(template_region, count, rng):
+	kinds = list(template_region["decorations"])
+	weights = [len(template_region["decorations"][kind]) for kind in kinds]
+	decorations = {}
+	for x, y in random_tiles(count, rng):
+		kind = rng.choices(kinds, weights)[0]
+		template = rng.choice(template_region["decorations"][kind])
+		decorations.setdefault(kind, []).append({"TileColor": template["TileColor"], "MapColor": template["MapColor"], "X": x, "Y": y})
+	return decorations
+
+def generate(template, entities=5000, tiles=10000, decorations=7000, regions=1, seed=0):
+	""" A new json_data with the template's top level and, in each region, the given number of entities,
+	resource tiles and decoration tiles. The same seed always gives the same save """
+	rng = random.Random(seed)
+	template_region = template["regions"]["region_the_abyss"]
+	json_data = {key: copy.deepcopy(value) for key, value in template.items() if key != "regions"}
+	json_data["regions"] = {}
+	next_id = 1
+	for number in range(regions):
+		region_id = region_id_for(number)
+		region_entities, next_id = make_entities(template_region, entities, rng, next_id)
+		json_data["regions"][region_id] = {
+			"ID": region_id,
+			"resources": make_resources(template_region, tiles, rng),
+			"entities": region_entities,
+			"worldFeatures": {},
+			"decorations": make_decorations(template_region, decorations, rng),
+			"preview": copy.deepcopy(template_region["preview"]),
+		}
+	# Keep the key order the game writes
+	json_data = {key: json_data[key] for key in template}
+	json_data["FileName"] = "bench.sav"
+	return json_data
+
+def load_template(path=TEMPLATE_PATH):
+	template, _ = save_io.load_save(path)
+	return template
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Write a synthetic .sav shaped like the example save.")
+	parser.add_argument("output")
+	parser.add_argument("--entities", type=int, default=5000, help="per region")
+	parser.add_argument("--tiles", type=int, default=10000, help="resource tiles per region")
+	parser.add_argument("--decorations", type=int, default=7000, help="decoration tiles per region")
+	parser.add_argument("--regions", type=int, default=1)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--template", default=TEMPLATE_PATH, help="save to copy the shape from")
+	args = parser.parse_args(argv)
+
+	json_data = generate(load_template(args.template), args.entities, args.tiles, args.decorations, args.regions, args.seed)
+	timings = save_io.export_save(json_data, args.output)
+	print(f"Wrote {args.output}: {args.regions} regions x {args.entities} entities, {args.tiles} tiles, {args.decorations} decorations | {save_io.format_timings(timings)}")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,76 @@
+""" How long each entry point takes to import, in a fresh interpreter every time.
+
+python bench/import_time.py
+python bench/import_time.py --runs 20 save_model batch gui
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: time just the import, and report whether Qt came along with it
+CHILD_CODE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, "PySide6" in sys.modules)
+"""
+
+def time_import(module, runs):
+	""" Median import time in seconds over fresh interpreters, and whether it loaded PySide6 """
+	times = []
+	loads_qt = False
+	for _ in range(runs):
+		output = subprocess.check_output([sys.executable, "-c", CHILD_CODE.format(module=module)], cwd=REPO_DIR, text=True)
+		seconds, qt = output.split()
+		times.append(float(seconds))
+		loads_qt = qt == "True"
+	return statistics.median(times), loads_qt
+
+def heaviest_imports(module, count):
+	""" The slowest direct imports of the module, from python -X importtime """
+	process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=REPO_DIR, capture_output=True, text=True)
+	entries = []
+	for line in process.stderr.splitlines():
+		if not line.startswith("import time:") or "|" not in line:
+			continue
+		_, cumulative, name = line[len("import time:"):].split("|")
+		if cumulative.strip().isdigit():
+			entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative)))
+
+	# Children are printed before their parent, one level deeper, so walk back from the module's own line
+	children = []
+	for position in range(len(entries) - 1, -1, -1):
+		depth, name, _ = entries[position]
+		if name == module:
+			for child_depth, child_name, cumulative in reversed(entries[:position]):
+				if child_depth <= depth:
+					break
+				if child_depth == depth + 2:
+					children.append((child_name, cumulative))
+			break
+	return sorted(children, key=lambda item: item[1], reverse=True)[:count]
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Time the import of VecEdit's modules.")
+	parser.add_argument("modules", nargs="*", default=["save_model", "batch", "gui"])
+	parser.add_argument("--runs", type=int, default=10)
+	parser.add_argument("--top", type=int, default=5, help="how many of the heaviest imports to list")
+	args = parser.parse_args(argv)
+
+	print(f"Python {sys.version.split()[0]}, median of {args.runs} fresh interpreters")
+	for module in args.modules:
+		try:
+			seconds, loads_qt = time_import(module, args.runs)
+		except subprocess.CalledProcessError:
+			print(f"{module:12} failed to import")
+			continue
+		print(f"{module:12} {seconds * 1000:8.1f} ms  {'loads Qt' if loads_qt else 'no Qt'}")
+		for name, microseconds in heaviest_imports(module, args.top):
+			print(f"    {name:28} {microseconds / 1000:8.1f} ms")
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,216 @@
+""" Time every phase of opening, editing and saving at several save sizes.
+
+python bench/run_bench.py
+python bench/run_bench.py --scales 1,4,16 --json today.json
+python bench/run_bench.py --baseline today.json
+
+A scale of 1 is the size of the example save (about 5K entities and 10K resource tiles per region).
+The map and tree phases need PySide6 and are skipped without it, or with --no-gui.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import generate_save
+
+import save_io
+import save_model
+
+# Anything this much slower than the baseline gets flagged
+REGRESSION_THRESHOLD = 1.15
+
+def best_of(repeat, function):
+	""" Fastest of repeat runs in seconds, and the last run's result """
+	best = None
+	result = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return best, result
+
+class GuiPhases:
+	""" One offscreen window, reused for every size """
+	def __init__(self):
+		os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+		from PySide6.QtWidgets import QApplication
+		from PySide6.QtUiTools import QUiLoader
+		import gui
+		# The window finds main_window.ui relative to the working directory
+		os.chdir(generate_save.REPO_DIR)
+		self.app = QApplication.instance() or QApplication(sys.argv)
+		gui.loader = QUiLoader()
+		gui.app = self.app
+		self.window = gui.MainWindow()
+		self.window.ui.Tabs.setCurrentWidget(self.window.ui.MapTab)
+		self.window.show()
+
+	def populate_map(self, json_data, indexes):
+		window = self.window
+		window.document = save_model.SaveDocument(json_data)
+		window.process_entities(indexes)
+		window.populate_map_table()
+		# Make it actually paint what's on screen
+		window.ui.mapTable.grab()
+
+	def populate_tree(self, json_data):
+		window = self.window
+		window.document = save_model.SaveDocument(json_data)
+		window.populate_tree_view()
+		# Open every region, which is what people do first
+		model = window.ui.JsonTree.model()
+		regions = model.index_for_path(["regions"])
+		window.ui.JsonTree.expand(regions)
+		for row in range(model.rowCount(regions)):
+			window.ui.JsonTree.expand(model.index(row, 0, regions))
+		self.app.processEvents()
+		window.ui.JsonTree.grab()
+
+def make_edits(document, count, seed):
+	""" count tile edits and count / 5 building edits on the map region, pending until write-back """
+	rng = random.Random(seed)
+	grid = document.map_grid
+	resources = grid.resource_palette.ids[1:]
+	for _ in range(count):
+		document.map_edits.set_resource(rng.randrange(grid.width), rng.randrange(grid.height), rng.choice(resources))
+	handles = [handle for handle, _ in document.building_index.items()]
+	for handle in rng.sample(handles, min(len(handles), count // 5)):
+		entity = document.map_edits.edit_entity(document.building_index.entities[handle])
+		entity["FactionID"] = "faction_player"
+
+def run_size(scale, args, template, gui_phases, work_dir):
+	entities = int(5000 * scale)
+	tiles = int(10000 * scale)
+	decorations = int(7000 * scale)
+	json_data = generate_save.generate(template, entities, tiles, decorations, args.regions, args.seed)
+	path = os.path.join(work_dir, f"bench_{scale}.sav")
+	save_io.export_save(json_data, path)
+	timings = {}
+
+	# The editor's load: lazy and compacted, the way workers.LoadWorker reads a save. Indexing parses the fields the
+	# load left for later, so both are timed on a fresh document every run
+	load = index = None
+	for _ in range(args.repeat):
+		start = time.perf_counter()
+		document, _ = save_model.SaveDocument.load(path, compact=True)
+		loaded = time.perf_counter()
+		indexes = document.build_indexes()
+		indexed = time.perf_counter()
+		load = loaded - start if load is None else min(load, loaded - start)
+		index = indexed - loaded if index is None else min(index, indexed - loaded)
+	timings["load"] = load
+	timings["index"] = index
+	json_data = document.json_data
+	# The whole file parsed up front with no compaction, what batch mode and the lazy fallback do
+	timings["parse_eager"], _ = best_of(args.repeat, lambda: save_io.load_save(path))
+	if gui_phases is not None:
+		timings["map"], _ = best_of(args.repeat, lambda: gui_phases.populate_map(json_data, indexes))
+		timings["tree"], _ = best_of(args.repeat, lambda: gui_phases.populate_tree(json_data))
+
+	# Write-back changes the save, so every run gets a fresh copy and only apply_map_edits() is timed
+	write_back = None
+	for run in range(args.repeat):
+		document, _ = save_model.SaveDocument.load(path)
+		document.index()
+		make_edits(document, args.edits, args.seed + run)
+		start = time.perf_counter()
+		document.apply_map_edits()
+		elapsed = time.perf_counter() - start
+		write_back = elapsed if write_back is None else min(write_back, elapsed)
+	timings["write_back"] = write_back
+
+	export_path = os.path.join(work_dir, f"bench_{scale}_export.sav")
+	timings["export"], _ = best_of(args.repeat, lambda: document.export(export_path))
+	size = os.path.getsize(path)
+	return {"scale": scale, "entities": entities * args.regions, "tiles": tiles * args.regions, "bytes": size,
+		"memory": open_save_memory(path), "timings": timings}
+
+def open_save_memory(path):
+	""" Bytes an open, indexed save holds, the way the editor loads it """
+	tracemalloc.start()
+	try:
+		document, _ = save_model.SaveDocument.load(path, compact=True)
+		document.index()
+		return tracemalloc.get_traced_memory()[0]
+	finally:
+		tracemalloc.stop()
+
+def print_results(results, baseline):
+	phases = []
+	for result in results:
+		phases.extend(phase for phase in result["timings"] if phase not in phases)
+	print(f"{'scale':>6} {'entities':>9} {'tiles':>9} {'size':>8} {'memory':>8} " + " ".join(f"{phase:>11}" for phase in phases))
+	regressions = []
+	for result in results:
+		cells = []
+		old = baseline.get(str(result["scale"]), {}).get("timings", {})
+		for phase in phases:
+			seconds = result["timings"].get(phase)
+			if seconds is None:
+				cells.append(f"{'-':>11}")
+				continue
+			cell = f"{seconds * 1000:.1f}ms"
+			if phase in old and old[phase] > 0:
+				ratio = seconds / old[phase]
+				cell += "!" if ratio > REGRESSION_THRESHOLD else " "
+				if ratio > REGRESSION_THRESHOLD:
+					regressions.append(f"scale {result['scale']} {phase}: {old[phase] * 1000:.1f} ms -> {seconds * 1000:.1f} ms ({(ratio - 1) * 100:+.0f}%)")
+			cells.append(f"{cell:>11}")
+		memory = f"{result['memory'] / 1024 / 1024:.1f}MB" if "memory" in result else "-"
+		print(f"{result['scale']:>6} {result['entities']:>9} {result['tiles']:>9} {result['bytes'] / 1024 / 1024:>6.1f}MB {memory:>8} " + " ".join(cells))
+	return regressions
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark VecEdit's load, index, map, tree, write-back and export phases.")
+	parser.add_argument("--scales", default="0.5,1,4", help="comma separated multiples of the example save's size")
+	parser.add_argument("--regions", type=int, default=1)
+	parser.add_argument("--repeat", type=int, default=3, help="runs per phase, the fastest is kept")
+	parser.add_argument("--edits", type=int, default=1000, help="tile edits made before the write-back phase")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--no-gui", action="store_true", help="skip the map and tree phases")
+	parser.add_argument("--json", help="write the results here")
+	parser.add_argument("--baseline", help="results from an earlier --json run to compare against")
+	args = parser.parse_args(argv)
+	# The GUI phases change the working directory
+	args.json = os.path.abspath(args.json) if args.json else None
+	args.baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+	gui_phases = None
+	if not args.no_gui:
+		try:
+			gui_phases = GuiPhases()
+		except ImportError as e:
+			print(f"No GUI phases ({e})")
+
+	baseline = {}
+	if args.baseline:
+		with open(args.baseline, encoding="utf-8") as file:
+			baseline = {str(result["scale"]): result for result in json.load(file)["results"]}
+
+	print(f"Python {sys.version.split()[0]}, orjson {'on' if save_io.has_fast_parser() else 'off'}, best of {args.repeat}")
+	template = generate_save.load_template()
+	results = []
+	with tempfile.TemporaryDirectory() as work_dir:
+		for scale in (float(scale) if "." in scale else int(scale) for scale in args.scales.split(",")):
+			results.append(run_size(scale, args, template, gui_phases, work_dir))
+	regressions = print_results(results, baseline)
+
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as file:
+			json.dump({"python": sys.version.split()[0], "orjson": save_io.has_fast_parser(), "results": results}, file, indent=1)
+	if regressions:
+		print()
+		print(f"Slower than the baseline by more than {(REGRESSION_THRESHOLD - 1) * 100:.0f}%:")
+		for regression in regressions:
+			print(f"  {regression}")
+		return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,119 @@
+import copy
+from map_grid import TILE_SIZE
+import entity_store
+import lazy_save
+
+# Bulk filtering over every entity in every region in one pass.
+# Build a list of Rules, hand them to run_rules(), get back how many entities each rule touched.
+
+REMOVE = "remove"
+KEEP = "keep"
+MODIFY = "modify"
+
+class Rule:
+	""" Which entities to match and what to do with them. Every condition that's set has to match, None means any.
+	entity_ids, factions and component_types are sets, area is (x0, y0, x1, y1) in tiles, inclusive,
+	checked against the tile under the entity's centre. where is an extra function(entity) -> bool for anything else.
+	modify is a function(entity) that changes the entity in place, it's only used by MODIFY rules """
+	def __init__(self, name, action=REMOVE, entity_ids=None, factions=None, component_types=None, area=None, where=None, modify=None, regions=None, section="entities"):
+		if action not in (REMOVE, KEEP, MODIFY):
+			raise ValueError(f"unknown action {action!r}")
+		if action == MODIFY and modify is None:
+			raise ValueError("a modify rule needs a modify function")
+		self.name = name
+		self.action = action
+		self.entity_ids = frozenset(entity_ids) if entity_ids is not None else None
+		self.factions = frozenset(factions) if factions is not None else None
+		self.component_types = frozenset(component_types) if component_types is not None else None
+		self.area = area
+		self.where = where
+		self.modify = modify
+		self.regions = frozenset(regions) if regions is not None else None
+		self.section = section
+
+	def applies_to_list(self, region_id, section, entity_id):
+		""" Whether anything in this entity list could match, so lists no rule cares about are never scanned """
+		if section != self.section:
+			return False
+		if self.regions is not None and region_id not in self.regions:
+			return False
+		return self.entity_ids is None or entity_id in self.entity_ids
+
+	def compile(self):
+		""" A function(entity) -> bool that only checks the conditions that are set.
+		applies_to_list() has already checked the region, section and EntityID """
+		checks = []
+		if self.factions is not None:
+			factions = self.factions
+			checks.append(lambda entity: entity.get("FactionID") in factions)
+		if self.component_types is not None:
+			component_types = self.component_types
+			checks.append(lambda entity: any(component.get("Type") in component_types for component in entity.get("Components") or ()))
+		if self.area is not None:
+			x0, y0, x1, y1 = self.area
+			def in_area(entity):
+				pos_x = entity.get("PosX")
+				pos_y = entity.get("PosY")
+				if pos_x is None or pos_y is None:
+					return False
+				return x0 <= pos_x // TILE_SIZE <= x1 and y0 <= pos_y // TILE_SIZE <= y1
+			checks.append(in_area)
+		if self.where is not None:
+			checks.append(self.where)
+
+		if not checks:
+			return lambda entity: True
+		if len(checks) == 1:
+			return checks[0]
+		return lambda entity: all(check(entity) for check in checks)
+
+def run_rules(json_data, rules, on_replace=None):
+	""" Apply the rules to every entity list of every region. For each entity the first rule that matches decides:
+	REMOVE drops it, KEEP leaves it alone and MODIFY changes it in place, either way later rules don't see it.
+	Lists only get rebuilt if something was removed or modified in them, and are swapped in whole so on_replace(path,
+	old list, new list) can keep the old one for undo. For a modified entity the old list gets a copy of it as it was.
+	Returns {rule name: entities touched} """
+	counts = {rule.name: 0 for rule in rules}
+	predicates = [rule.compile() for rule in rules]
+	for region_id, region in json_data.get("regions", {}).items():
+		for section in ("entities", "worldFeatures"):
+			entity_lists = region.get(section)
+			if not entity_lists:
+				continue
+			for entity_id, entities in entity_lists.items():
+				active = [(rule, predicates[i]) for i, rule in enumerate(rules) if rule.applies_to_list(region_id, section, entity_id)]
+				if not active:
+					continue
+
+				# The list as it was, only made once something in it is modified
+				before = None
+				if len(active) == 1 and active[0][0].action == REMOVE:
+					# The common case, one removal rule for this list, stays a plain list comprehension
+					rule, matches = active[0]
+					kept = [entity for entity in entities if not matches(entity)]
+					counts[rule.name] += len(entities) - len(kept)
+				else:
+					kept = []
+					for position, entity in enumerate(entities):
+						for rule, matches in active:
+							if matches(entity):
+								counts[rule.name] += 1
+								if rule.action == MODIFY:
+									# The entity itself is changed, so the indexes holding it stay right, and undo gets a copy
+									if before is None:
+										before = list(entities)
+									before[position] = copy.deepcopy(entity)
+									rule.modify(entity_store.thaw_entity(entity))
+								elif rule.action == REMOVE:
+									entity = None
+								break
+						if entity is not None:
+							kept.append(entity)
+				if before is not None or len(kept) != len(entities):
+					path = ("regions", region_id, section, entity_id)
+					entity_lists[entity_id] = kept
+					# The section itself is the same dict, so a lazily loaded region has to be told
+					lazy_save.mark_changed(json_data, path)
+					if on_replace is not None:
+						on_replace(path, before if before is not None else entities, kept)
+	return counts
@@ -0,0 +1,218 @@
+from map_grid import TILE_SIZE
+
+# Inverted indexes over every entity in every region, so searches never walk the whole save.
+# Each entity gets a handle (an int, 0 is never used) and is filed under every key it has.
+
+# Entities are bucketed into square chunks of this many tiles for area searches
+CHUNK_SIZE = 16
+
+def centre_tile(entity):
+	""" The tile under the entity's centre, or None if it has no position """
+	pos_x = entity.get("PosX")
+	pos_y = entity.get("PosY")
+	if pos_x is None or pos_y is None:
+		return None
+	return int(pos_x // TILE_SIZE), int(pos_y // TILE_SIZE)
+
+def component_types(entity):
+	return {component.get("Type") for component in entity.get("Components") or ()}
+
+def storage_contents(entity):
+	""" Resource IDs held in any of the entity's storages """
+	contents = set()
+	for component in entity.get("Components") or ():
+		for key, value in component.items():
+			if key.endswith("Storage") and isinstance(value, list):
+				for item in value:
+					if isinstance(item, dict) and item.get("ID"):
+						contents.add(item["ID"])
+	return contents
+
+class EntityIndex:
+	""" EntityID, FactionID, component Type, resource under the entity, storage contents and position -> handles.
+	Call update() after changing an entity in place, add()/remove() when it's added to or taken out of the save """
+	def __init__(self):
+		self.entities = [None]
+		self.regions = [None]
+		self.tiles = [None]
+		self.free_handles = []
+		self.handles_by_object = {}
+		self.by_entity_id = {}
+		self.by_faction = {}
+		self.by_component = {}
+		self.by_resource = {}
+		self.by_storage = {}
+		self.by_region = {}
+		# (region id, chunk x, chunk y) -> handles
+		self.chunks = {}
+		# region id -> {(x, y): resource}, used to file entities under the resource they sit on
+		self.resource_tiles = {}
+		# handle -> [(index dict, key)] it's filed under, so it can be taken out again without a search
+		self.filed_under = [None]
+		# Regions are added one at a time as they're needed, see add_region()
+		self.indexed_regions = set()
+
+	@classmethod
+	def build(cls, json_data, check_cancelled=None, regions=None):
+		""" Index every region, or only the region ids in regions """
+		index = cls()
+		for region_id, region in json_data.get("regions", {}).items():
+			if regions is None or region_id in regions:
+				index.add_region(region_id, region, check_cancelled)
+		return index
+
+	def add_region(self, region_id, region, check_cancelled=None):
+		""" File every entity of a region that isn't indexed yet """
+		self.resource_tiles[region_id] = {(tile["X"], tile["Y"]): resource for resource, tiles in region.get("resources", {}).items() for tile in tiles}
+		for entities in region.get("entities", {}).values():
+			if check_cancelled is not None:
+				check_cancelled()
+			for entity in entities:
+				self.add(region_id, entity)
+		self.indexed_regions.add(region_id)
+
+	def __len__(self):
+		return len(self.handles_by_object)
+
+	def __getstate__(self):
+		# Object ids mean nothing in another process, they're worked out again when it's unpickled
+		state = dict(self.__dict__)
+		del state["handles_by_object"]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.handles_by_object = {id(entity): handle for handle, entity in enumerate(self.entities) if entity is not None}
+
+	def _file(self, handle, index, key):
+		if key is None:
+			return
+		index.setdefault(key, set()).add(handle)
+		self.filed_under[handle].append((index, key))
+
+	def _file_all(self, handle):
+		entity = self.entities[handle]
+		region_id = self.regions[handle]
+		self._file(handle, self.by_region, region_id)
+		self._file(handle, self.by_entity_id, entity.get("EntityID"))
+		self._file(handle, self.by_faction, entity.get("FactionID"))
+		for component_type in component_types(entity):
+			self._file(handle, self.by_component, component_type)
+		for resource in storage_contents(entity):
+			self._file(handle, self.by_storage, resource)
+		tile = centre_tile(entity)
+		self.tiles[handle] = tile
+		if tile is not None:
+			self._file(handle, self.chunks, (region_id, tile[0] // CHUNK_SIZE, tile[1] // CHUNK_SIZE))
+			self._file(handle, self.by_resource, self.resource_tiles.get(region_id, {}).get(tile))
+
+	def _unfile_all(self, handle):
+		for index, key in self.filed_under[handle]:
+			handles = index[key]
+			handles.discard(handle)
+			if not handles:
+				del index[key]
+		self.filed_under[handle] = []
+
+	def add(self, region_id, entity):
+		if self.free_handles:
+			handle = self.free_handles.pop()
+			self.entities[handle] = entity
+			self.regions[handle] = region_id
+			self.filed_under[handle] = []
+		else:
+			handle = len(self.entities)
+			self.entities.append(entity)
+			self.regions.append(region_id)
+			self.tiles.append(None)
+			self.filed_under.append([])
+		self.handles_by_object[id(entity)] = handle
+		self._file_all(handle)
+		return handle
+
+	def remove(self, handle):
+		self._unfile_all(handle)
+		del self.handles_by_object[id(self.entities[handle])]
+		self.entities[handle] = None
+		self.regions[handle] = None
+		self.tiles[handle] = None
+		self.free_handles.append(handle)
+
+	def update(self, handle):
+		""" Re-file an entity that was changed in place """
+		self._unfile_all(handle)
+		self._file_all(handle)
+
+	def handle_for(self, entity):
+		""" The handle of this exact entity dict, or 0 """
+		return self.handles_by_object.get(id(entity), 0)
+
+	def set_resource_tile(self, region_id, x, y, resource):
+		""" Keep resource searches right after the map editor changes a tile """
+		tiles = self.resource_tiles.setdefault(region_id, {})
+		if resource is None:
+			tiles.pop((x, y), None)
+		else:
+			tiles[(x, y)] = resource
+		for handle in list(self.chunks.get((region_id, x // CHUNK_SIZE, y // CHUNK_SIZE), ())):
+			if self.tiles[handle] == (x, y):
+				self.update(handle)
+
+	def in_area(self, region_id, x0, y0, x1, y1):
+		""" Handles with their centre in the tile rectangle, inclusive. Only the chunks it overlaps are looked at """
+		found = set()
+		for chunk_x in range(x0 // CHUNK_SIZE, x1 // CHUNK_SIZE + 1):
+			for chunk_y in range(y0 // CHUNK_SIZE, y1 // CHUNK_SIZE + 1):
+				handles = self.chunks.get((region_id, chunk_x, chunk_y))
+				if not handles:
+					continue
+				# Chunks completely inside the rectangle don't need checking tile by tile
+				if x0 <= chunk_x * CHUNK_SIZE and (chunk_x + 1) * CHUNK_SIZE - 1 <= x1 and y0 <= chunk_y * CHUNK_SIZE and (chunk_y + 1) * CHUNK_SIZE - 1 <= y1:
+					found |= handles
+					continue
+				for handle in handles:
+					x, y = self.tiles[handle]
+					if x0 <= x <= x1 and y0 <= y <= y1:
+						found.add(handle)
+		return found
+
+	def search(self, region=None, entity_ids=None, factions=None, component_types=None, resources=None, storage=None, area=None):
+		""" Handles matching every condition that's set, sorted. Each condition is a collection of accepted keys,
+		area is (x0, y0, x1, y1) in tiles and needs a region """
+		candidate_sets = []
+		for index, keys in ((self.by_entity_id, entity_ids), (self.by_faction, factions), (self.by_component, component_types), (self.by_resource, resources), (self.by_storage, storage)):
+			if keys is None:
+				continue
+			union = set()
+			for key in keys:
+				union |= index.get(key, set())
+			candidate_sets.append(union)
+		if area is not None:
+			if region is None:
+				raise ValueError("an area search needs a region")
+			candidate_sets.append(self.in_area(region, *area))
+		elif region is not None:
+			candidate_sets.append(self.by_region.get(region, set()))
+
+		if not candidate_sets:
+			return [handle for handle in range(1, len(self.entities)) if self.entities[handle] is not None]
+		# Intersect smallest first so the work is bounded by the rarest condition
+		candidate_sets.sort(key=len)
+		result = set(candidate_sets[0])
+		for handles in candidate_sets[1:]:
+			result &= handles
+			if not result:
+				break
+		return sorted(result)
+
+	def tree_path(self, handle, json_data):
+		""" Where the entity is in json_data, for jumping to it in the manual editor. None if it's not there any more """
+		return entity_path(json_data, self.regions[handle], self.entities[handle])
+
+def entity_path(json_data, region_id, entity):
+	""" Path of this exact entity dict in json_data, or None """
+	entity_id = entity.get("EntityID")
+	for position, other in enumerate(json_data["regions"][region_id]["entities"].get(entity_id, ())):
+		if other is entity:
+			return ["regions", region_id, "entities", entity_id, position]
+	return None
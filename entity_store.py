@@ -0,0 +1,152 @@
+import copy
+import sys
+
+# Cuts the memory a parsed save takes without changing what it is: entities stay plain dicts, so everything that
+# reads json_data works as before and it serializes to exactly the same bytes.
+# compact_entities() interns the ID strings, shares equal positions, and makes every entity with the same AccentData
+# or LinkedEntityID point at one read-only copy. Most entities of a faction have the same colours and parent, so
+# these records, the biggest part of a plain entity, are mostly stored once.
+# Shared records are FrozenDict/FrozenList and refuse to be changed. Anything that writes into json_data by path goes
+# through writable(), which swaps a private copy in first.
+
+# Fields whose values are the same few IDs over and over
+INTERNED_FIELDS = ("EntityID", "FactionID", "ModelID")
+POSITION_FIELDS = ("PosX", "PosY")
+# Small records that are usually identical between entities
+SHARED_FIELDS = ("AccentData", "LinkedEntityID")
+
+def _frozen(self, *args, **kwargs):
+	raise TypeError(f"this {type(self).__name__} is shared between entities, change it through entity_store.writable()")
+
+class FrozenDict(dict):
+	""" A dict that's shared between entities. Reads like any dict, serializes like one, but can't be changed """
+	__slots__ = ()
+	__setitem__ = __delitem__ = __ior__ = _frozen
+	clear = pop = popitem = setdefault = update = _frozen
+
+	def __copy__(self):
+		return dict(self)
+
+	def __deepcopy__(self, memo):
+		# Copies are for changing, so they come back as plain dicts
+		return copy.deepcopy(dict(self), memo)
+
+	def __reduce__(self):
+		return (FrozenDict, (dict(self),))
+
+class FrozenList(list):
+	""" The list version of FrozenDict """
+	__slots__ = ()
+	__setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+	append = extend = insert = pop = remove = clear = sort = reverse = _frozen
+
+	def __copy__(self):
+		return list(self)
+
+	def __deepcopy__(self, memo):
+		return copy.deepcopy(list(self), memo)
+
+	def __reduce__(self):
+		return (FrozenList, (list(self),))
+
+EMPTY_LIST = FrozenList()
+
+def plain_type(value):
+	""" type() with shared records (and lazily loaded regions) counted as the dict or list they stand for """
+	if isinstance(value, dict):
+		return dict
+	if isinstance(value, list):
+		return list
+	return type(value)
+
+def thaw(value):
+	""" A private, changeable copy of a shared record. Anything else is returned as it is """
+	if isinstance(value, FrozenDict):
+		return dict(value)
+	if isinstance(value, FrozenList):
+		return list(value)
+	return value
+
+def writable(data, path):
+	""" The container at path, with any shared record on the way swapped for a private copy so it can be changed """
+	for key in path:
+		child = data[key]
+		if isinstance(child, (FrozenDict, FrozenList)):
+			child = thaw(child)
+			data[key] = child
+		data = child
+	return data
+
+def thaw_entity(entity):
+	""" Give an entity private copies of its shared records, before code that changes it in place. Returns it """
+	for key, value in entity.items():
+		if isinstance(value, (FrozenDict, FrozenList)):
+			entity[key] = thaw(value)
+	return entity
+
+def record_key(record):
+	""" A key that's only equal for records that serialize the same, or None if the record can't be shared """
+	values = tuple(record.values())
+	types = tuple(map(type, values))
+	if float in types and any(type(value) is float and not value for value in values):
+		# 0.0 and -0.0 are equal but are written differently
+		return None
+	return (tuple(record), values, types)
+
+def compact_entities(json_data, check_cancelled=None):
+	""" Compact every entity in every region in place. Returns counts for logging """
+	records = {}
+	positions = {}
+	entity_count = 0
+	shared = 0
+	for region in json_data.get("regions", {}).values():
+		for section in ("entities", "worldFeatures"):
+			entities, records_shared = compact_section(region.get(section), records, positions, check_cancelled)
+			entity_count += entities
+			shared += records_shared
+	return {"entities": entity_count, "records": len(records), "shared": shared}
+
+def compact_section(section, records=None, positions=None, check_cancelled=None):
+	""" Compact one region's entities or worldFeatures in place. records and positions are what's already shared,
+	pass the same ones to share across sections. Returns (entities, records shared) """
+	records = {} if records is None else records
+	positions = {} if positions is None else positions
+	intern = sys.intern
+	entity_count = 0
+	shared = 0
+	for entities in (section or {}).values():
+		if check_cancelled is not None:
+			check_cancelled()
+		for entity in entities:
+			if not isinstance(entity, dict):
+				continue
+			entity_count += 1
+			for key in INTERNED_FIELDS:
+				value = entity.get(key)
+				if type(value) is str:
+					entity[key] = intern(value)
+			for key in POSITION_FIELDS:
+				value = entity.get(key)
+				if type(value) is float and value:
+					entity[key] = positions.setdefault(value, value)
+			for key in SHARED_FIELDS:
+				value = entity.get(key)
+				if type(value) is not dict:
+					continue
+				record = record_key(value)
+				if record is None:
+					continue
+				record = (key, record)
+				try:
+					frozen = records.get(record)
+				except TypeError:
+					# Something inside isn't hashable, so it's not a flat record
+					continue
+				if frozen is None:
+					frozen = records[record] = FrozenDict(value)
+				entity[key] = frozen
+				shared += 1
+			components = entity.get("Components")
+			if type(components) is list and not components:
+				entity["Components"] = EMPTY_LIST
+	return entity_count, shared
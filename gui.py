@@ -0,0 +1,1041 @@
+import sys
+import functools
+from PySide6.QtWidgets import *
+from PySide6.QtGui import *
+from PySide6.QtUiTools import *
+from PySide6.QtCore import *
+import os
+import platform
+import time
+import reference as ref # separate reference file for a cleaner main file
+import instrument
+import save_io
+import save_model
+import save_diff
+import snapshot_cache
+import workers
+from map_grid import MapGrid
+from json_tree_model import JsonTreeModel
+from minimap import Minimap
+import icon_cache
+import map_tools
+from map_model import MapTableModel
+from map_view import MapView
+
+# Lines are kept in memory and written every 100 lines or 2 seconds, and once more on exit
+log = instrument.BufferedLog("./ve_log.log")
+
+# Cell sizes zooming steps through below 10 px, above that it goes in 5 px steps
+SMALL_CELL_SIZES = [1, 2, 3, 5]
+
+def log_to_file(text):
+	log.write(text)
+
+def detect_darkmode_in_windows():
+	log_to_file("Other function called.")
+	try:
+		import winreg
+	except ImportError:
+		return False
+	log_to_file("Winreg works")
+	registry = winreg.ConnectRegistry(None, winreg.HKEY_CURRENT_USER)
+	reg_keypath = r'SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Themes\\Personalize'
+	try:
+		reg_key = winreg.OpenKey(registry, reg_keypath)
+	except FileNotFoundError:
+		return False
+	log_to_file("Key imported")
+
+	for i in range(1024):
+		try:
+			value_name, value, _ = winreg.EnumValue(reg_key, i)
+			if value_name == 'AppsUseLightTheme':
+				log_to_file(f"Dark mode in Windows: {value == 0}")
+				return value == 0
+		except OSError:
+			break
+
+	log_to_file("Everything else broke.")
+	return False
+
+def detect_dark_mode():
+	log_to_file("Detecting dark mode")
+	if platform.system() == 'Linux':
+		try:
+			log_to_file("You are a Linux user.")
+			import subprocess
+			dark_mode = subprocess.check_output(
+				'gsettings get org.gnome.desktop.interface gtk-theme', shell=True).decode().strip()
+			log_to_file(f"Dark mode for Linux: {'dark' in dark_mode.lower()}")
+			return 'dark' in dark_mode.lower()
+		except:
+			pass
+	elif platform.system() == 'Windows':
+		log_to_file("You're a windows person. Moving detection to other function")
+		return detect_darkmode_in_windows()
+
+	elif platform.system() == 'Darwin':
+		log_to_file("ew macos")
+		try:
+			import subprocess
+			dark_mode = subprocess.check_output(
+				'ddefaults read -g AppleInterfaceStyle', shell=True).decode().strip()
+			log_to_file(f"Dark mode for $$$: {'dark' in dark_mode.lower()}")
+			return 'dark' in dark_mode.lower()
+		except:
+			pass
+
+	log_to_file("You're not using Windows, MacOS, or Linux. Why? WHY?")
+	return False
+
+def resource_path(relative_path):
+	""" Get the absolute path to the resource, works for dev and for PyInstaller """
+	try:
+		# PyInstaller creates a temp folder and stores path in _MEIPASS
+		base_path = sys._MEIPASS
+	except Exception:
+		base_path = os.path.abspath(".")
+
+	return os.path.join(base_path, relative_path)
+
+class MainWindow(QMainWindow):
+	def __init__(self):
+		super(MainWindow, self).__init__()
+
+		ui_file_path = resource_path('main_window.ui')
+		# mapTable is a MapView, which paints from cached chunks
+		loader.registerCustomWidget(MapView)
+		self.ui = loader.load(ui_file_path, self)
+
+		self.ui.ImportButton.clicked.connect(self.load_json_data)
+		self.ui.ExportButton.clicked.connect(self.export_json_data)
+
+		# Connect the checkbox signal to the slot
+		self.ui.checkBox.stateChanged.connect(self.toggle_stylesheet)
+		
+		# Ensure the checkbox is checked by default
+		self.ui.checkBox.setChecked(True)
+
+		self.ui.RemoveUnitsButton.clicked.connect(self.remove_enemy_units)
+		self.ui.RemoveBuildingsButton.clicked.connect(self.remove_enemy_buildings)
+		self.ui.UnlockResearchButton.clicked.connect(self.unlock_all_research)
+		self.ui.RemoveDecryptorsButton.clicked.connect(self.remove_all_decryptors)
+
+		# Images are loaded once per process and shared by every cell and every load
+		script_dir = os.path.dirname(os.path.abspath(__file__))
+		self.map_model = MapTableModel(icon_cache.shared_cache(script_dir + "/Images"), self)
+		self.ui.mapTable.setModel(self.map_model)
+		self.ui.mapTable.verticalHeader().setVisible(False)
+		self.ui.mapTable.horizontalHeader().setVisible(False)
+
+		# Minimap sits over the bottom right corner of the map, clear of the scroll bars
+		self.minimap = Minimap(self.ui.MapTab)
+		map_geometry = self.ui.mapTable.geometry()
+		self.minimap.setGeometry(map_geometry.right() - 120, map_geometry.bottom() - 120, 100, 100)
+		self.minimap.setVisible(False)
+		self.minimap.tileClicked.connect(self.jump_to_tile)
+		self.ui.mapTable.horizontalScrollBar().valueChanged.connect(self.update_minimap_view)
+		self.ui.mapTable.verticalScrollBar().valueChanged.connect(self.update_minimap_view)
+
+		self.cell_size = 30
+		self.update_cell_size()
+
+		# Zoom in and zoom out shortcuts
+		self.zoom_in_shortcut = QShortcut(QKeySequence("Ctrl+="), self)
+		self.zoom_in_shortcut.activated.connect(self.zoom_in)
+		self.zoom_in_shortcut.setEnabled(False)
+		self.zoom_out_shortcut = QShortcut(QKeySequence("Ctrl+-"), self)
+		self.zoom_out_shortcut.activated.connect(self.zoom_out)
+		self.zoom_out_shortcut.setEnabled(False)
+
+		self.ui.mapTable.clicked.connect(lambda index: self.cell_was_clicked(index.row(), index.column()))
+
+		# Multi-tile tools. Brush strokes paint as the mouse moves over cells with the button held
+		for label, tool in (("Select", "select"), ("Brush", "brush"), ("Flood fill", "flood")):
+			self.ui.toolInput.addItem(label, tool)
+		self.ui.fillResourceInput.addItem("Keep resource", None)
+		self.ui.fillResourceInput.addItem("No resource", "")
+		for resource in ref.resource_list:
+			self.ui.fillResourceInput.addItem(" ".join(resource.split("_")[1:]).title(), resource)
+		self.ui.fillOwnerInput.addItem("Keep owner", None)
+		self.ui.fillOwnerInput.addItem("Player", "faction_player")
+		self.ui.fillOwnerInput.addItem("Redscar", "faction_redscar")
+		self.ui.toolInput.currentIndexChanged.connect(self.on_tool_changed)
+		self.ui.mapTable.setMouseTracking(True)
+		self.ui.mapTable.pressed.connect(self.on_map_pressed)
+		self.ui.mapTable.entered.connect(self.on_map_entered)
+		self.ui.fillSelectionButton.clicked.connect(self.fill_selection)
+		self.ui.clearSelectionButton.clicked.connect(self.clear_selection)
+
+		self.ui.Tabs.currentChanged.connect(self.on_tab_changed)
+
+		self.ui.updateSimpleButton.clicked.connect(self.update_json_simple)
+		self.ui.updateMapButton.clicked.connect(self.update_json_map)
+		self.ui.updateManualButton.clicked.connect(self.update_json_manual)
+		self.ui.reloadButton.clicked.connect(self.reload_editors)
+
+		self.ui.searchButton.clicked.connect(self.run_search)
+		self.ui.searchShowMapButton.clicked.connect(self.show_result_on_map)
+		self.ui.searchShowTreeButton.clicked.connect(self.show_result_in_tree)
+		self.ui.searchResults.itemDoubleClicked.connect(lambda item: self.show_result_on_map())
+	
+		self.map_update_shortcut = QShortcut(QKeySequence(Qt.CTRL | Qt.Key_Return), self)
+		self.map_update_shortcut.activated.connect(self.update_map_tile)
+		self.map_update_shortcut.setEnabled(False)
+
+		self.undo_shortcut = QShortcut(QKeySequence.Undo, self)
+		self.undo_shortcut.activated.connect(self.undo)
+		self.redo_shortcut = QShortcut(QKeySequence.Redo, self)
+		self.redo_shortcut.activated.connect(self.redo)
+		self.ui.compareButton.clicked.connect(self.compare_with_save)
+		self.ui.undoButton.clicked.connect(self.undo)
+		self.ui.redoButton.clicked.connect(self.redo)
+		self.ui.historyDepthInput.valueChanged.connect(lambda depth: self.document.journal.set_max_depth(depth))
+		self.ui.regionBudgetInput.valueChanged.connect(lambda megabytes: self.document.set_region_budget(megabytes * 1024 * 1024))
+		self.ui.mapRegionInput.currentTextChanged.connect(self.switch_map_region)
+		self.ui.showDecorationsCheckBox.toggled.connect(self.map_model.set_show_decorations)
+		self.ui.decorationInput.addItem("None", None)
+		for kind in ref.decoration_list:
+			self.ui.decorationInput.addItem(" ".join(kind.split("_")[1:]).title(), kind)
+		# Saves that were opened before load from a snapshot of their parsed data and indexes
+		self.snapshot_cache = snapshot_cache.SnapshotCache(budget_bytes=self.ui.snapshotBudgetInput.value() * 1024 * 1024)
+		self.ui.snapshotBudgetInput.valueChanged.connect(self.set_snapshot_budget)
+		self.ui.clearSnapshotsButton.clicked.connect(self.clear_snapshots)
+		self.ui.exportTraceButton.clicked.connect(self.export_trace)
+
+		self.ui.input1.setVisible(False)
+		self.ui.input2.setVisible(False)
+		self.ui.input3.setVisible(False)
+		self.ui.input4.setVisible(False)
+		self.ui.input5.setVisible(False)
+
+		# Everything about the open save lives here, the window only shows it
+		self.document = save_model.SaveDocument()
+		self.selected_tile = None
+
+		self.load_worker = None
+		self.load_thread = None
+		# The save being loaded, only swapped in for self.document once it's indexed
+		self.loading_document = None
+		self.ui.cancelLoadButton.clicked.connect(self.cancel_load)
+		self.set_loading(False)
+
+	def toggle_stylesheet(self, state):
+		if state == 2:
+			print("Dark mode enabled")
+			app.setStyleSheet(ref.dark_stylesheet)
+		else:
+			print("Dark mode disabled")
+			app.setStyleSheet(ref.light_stylesheet)
+		# The map's cached chunks are drawn on the old background
+		self.ui.mapTable.invalidate_all()
+
+	def load_json_data(self):
+		if self.load_thread is not None:
+			print("Already loading, ignoring import.")
+			return
+		file_dialog = QFileDialog(self)
+		file_path, _ = file_dialog.getOpenFileName(self, "Open SAV File", "", "SAV Files (*.sav)")
+		if file_path:
+			self.ui.statusLabel.setText("Status: Loading file...")
+			self.start_load(file_path=file_path)
+
+	def start_load(self, file_path=None, json_data=None):
+		# Parsing and indexing happen on a worker thread, the views get filled in as each step finishes
+		self.load_start_time = time.perf_counter()
+		self.load_kind = "load" if file_path is not None else "reload"
+		self.load_file_path = file_path if file_path is not None else self.document.file_path
+		# Only one region gets indexed up front: the save's active region, or on reload the one being shown
+		region_id = self.document.map_region if json_data is not None else None
+		index_function = functools.partial(save_model.index_entities, region_id=region_id)
+		self.load_worker = workers.LoadWorker(index_function, file_path=file_path, json_data=json_data, snapshot_cache=self.snapshot_cache)
+		self.load_worker.progress.connect(self.on_load_progress)
+		self.load_worker.parsed.connect(self.on_load_parsed)
+		self.load_worker.indexed.connect(self.on_load_indexed)
+		self.load_worker.failed.connect(self.on_load_failed)
+		self.load_worker.cancelled.connect(self.on_load_cancelled)
+		self.set_loading(True)
+		self.load_thread = workers.start_worker(self.load_worker)
+		self.load_thread.finished.connect(self.on_load_finished)
+
+	def cancel_load(self):
+		if self.load_worker is not None:
+			print("Cancelling load...")
+			self.load_worker.cancel()
+
+	def set_loading(self, loading):
+		self.ui.ImportButton.setEnabled(not loading)
+		self.ui.ExportButton.setEnabled(not loading)
+		self.ui.reloadButton.setEnabled(not loading)
+		self.ui.mapRegionInput.setEnabled(not loading)
+		# Nothing can change the save until the worker is done with it
+		for button in (self.ui.updateSimpleButton, self.ui.updateMapButton, self.ui.updateManualButton, self.ui.RemoveUnitsButton,
+				self.ui.RemoveBuildingsButton, self.ui.UnlockResearchButton, self.ui.RemoveDecryptorsButton):
+			button.setEnabled(not loading)
+		self.ui.cancelLoadButton.setVisible(loading)
+		self.ui.loadProgressBar.setVisible(loading)
+		self.ui.loadProgressBar.setValue(0)
+
+	def on_load_progress(self, message, percent):
+		self.ui.statusLabel.setText(f"Status: {message}")
+		self.ui.loadProgressBar.setValue(percent)
+
+	def on_load_parsed(self, data):
+		# Reloading the same data keeps its undo history, a new save starts a new one.
+		# The open save stays as it is until this one's indexed, so cancelling the load keeps it and its edits
+		journal = self.document.journal if data is self.document.json_data else None
+		self.loading_document = save_model.SaveDocument(data, self.load_file_path, journal, self.ui.regionBudgetInput.value() * 1024 * 1024)
+		self.loading_document.journal.set_max_depth(self.ui.historyDepthInput.value())
+		print("Populating simple view...")
+		with instrument.span("load.simple_view"):
+			self.populate_simple_view(data)
+		print("Simple view populated.")
+
+	def on_load_indexed(self, indexes):
+		self.document = self.loading_document
+		self.loading_document = None
+		# Anything still showing is from the old data, so clear it before filling in the new
+		self.map_model.set_grid(MapGrid())
+		self.minimap.set_preview(None)
+		self.ui.JsonTree.setModel(None)
+		self.on_load_progress("Populating map view...", 70)
+		with instrument.span("load.map_view"):
+			self.process_entities(indexes)
+			self.populate_map_table()
+			self.populate_map_regions()
+		print("Map view populated.")
+		with instrument.span("load.search_view"):
+			self.reset_search()
+		# Let the map paint before we start on the tree
+		self.on_load_progress("Populating tree view...", 90)
+		QTimer.singleShot(0, self.finish_load)
+
+	def finish_load(self):
+		with instrument.span("load.tree_view"):
+			self.populate_tree_view()
+		print("Tree view populated.")
+		self.ui.statusLabel.setText("Status: File loaded.")
+		# The whole load, from the click to the last view, as one span around the phases above
+		duration = instrument.record(self.load_kind, self.load_start_time, time.perf_counter(), file=self.load_file_path)
+		print(f"Load finished in {duration * 1000:.1f} ms")
+
+	def on_load_failed(self, message):
+		print(f"Load failed: {message}")
+		log_to_file(f"Load failed: {message}")
+		self.ui.statusLabel.setText("Status: Load failed.")
+		self.drop_loading_document()
+
+	def on_load_cancelled(self):
+		print("Load cancelled.")
+		self.ui.statusLabel.setText("Status: Load cancelled.")
+		self.drop_loading_document()
+
+	def drop_loading_document(self):
+		# The simple view may already show the save that didn't finish loading
+		if self.loading_document is not None:
+			self.loading_document = None
+			if self.document.is_loaded():
+				self.populate_simple_view()
+
+	def on_load_finished(self):
+		self.load_thread.wait()
+		self.load_worker = None
+		self.load_thread = None
+		self.set_loading(False)
+
+	def populate_simple_view(self, json_data=None):
+		if json_data is None:
+			json_data = self.document.json_data
+		filename_string = json_data['FileName']
+		print(f"String is set. | {filename_string}")
+		self.ui.FilenameInput.setText(filename_string)
+
+		savename_string = json_data['Name']
+		print(f"String is set. | {savename_string}")
+		self.ui.SavenameInput.setText(savename_string)
+
+		description_string = json_data['Description']
+		print(f"String is set. | {description_string}")
+		self.ui.DescriptionInput.setText(description_string)
+
+		version_string = json_data['Version']
+		print(f"Float is set. | {version_string}")
+		self.ui.VersionInput.setText(version_string)
+
+		playtime_float = float(json_data['WorldTime'])
+		print(f"Float is set. | {playtime_float}")
+		self.ui.PlaytimeInput.setValue(playtime_float)
+
+		seed_int = int(json_data['Seed'])
+		print(f"Int is set. | {seed_int}")
+		self.ui.SeedInput.setValue(seed_int)
+
+		gamemode_data = json_data['GamemodeData']
+		gamemode_string = gamemode_data["ID"]
+		print(f"String is set. | {gamemode_string}")
+
+		# Find the index of the gamemode_string
+		gamemode_index = self.ui.GamemodeInput.findText(gamemode_string)
+		if gamemode_index == -1:
+			print(f"Error: gamemode_string '{gamemode_string}' not found in GamemodeInput.")
+		else:
+			self.ui.GamemodeInput.setCurrentIndex(gamemode_index)
+
+		region_string = json_data['ActiveRegion']
+		print(f"String is set. | {region_string}")
+
+		# Find the index of the gamemode_string
+		region_index = self.ui.RegionInput.findText(region_string)
+		if region_index == -1:
+			print(f"Error: region_string '{region_string}' not found in RegionInput.")
+		else:
+			self.ui.RegionInput.setCurrentIndex(region_index)
+
+	def process_entities(self, indexes=None):
+		if indexes is None:
+			self.document.index()
+		else:
+			self.document.set_indexes(indexes)
+
+	def populate_map_table(self):
+		# The model reads straight from the grid, so this is just a reset
+		self.map_model.set_grid(self.document.map_grid)
+		self.minimap.set_preview(self.document.preview_image)
+		self.update_minimap_view()
+
+	def populate_map_regions(self):
+		self.ui.mapRegionInput.blockSignals(True)
+		self.ui.mapRegionInput.clear()
+		self.ui.mapRegionInput.addItems(self.document.region_ids())
+		self.ui.mapRegionInput.setCurrentText(self.document.map_region or "")
+		self.ui.mapRegionInput.blockSignals(False)
+
+	def switch_map_region(self, region_id):
+		document = self.document
+		if not region_id or not document.indexed or region_id == document.map_region:
+			return
+		# A region that was shown before is still cached unless it went over the memory budget
+		built = region_id not in document.region_views
+		self.ui.statusLabel.setText(f"Status: {'Loading' if built else 'Showing'} {region_id}...")
+		QApplication.setOverrideCursor(Qt.WaitCursor)
+		try:
+			with instrument.span("map.switch_region", region=region_id, built=built):
+				document.show_region(region_id)
+				self.populate_map_table()
+		finally:
+			QApplication.restoreOverrideCursor()
+		self.selected_tile = None
+		self.ui.coordsDisplay.setText("")
+		self.ui.statusLabel.setText(f"Status: Showing {region_id}.")
+
+	def populate_tree_view(self):
+		# Rows are only made when a node is expanded, so this is instant whatever the save size
+		model = JsonTreeModel(self.document.json_data, self.ui.JsonTree)
+		self.ui.JsonTree.setModel(model)
+
+		self.ui.JsonTree.setColumnWidth(0, 200)
+		self.ui.JsonTree.setColumnWidth(1, 500)
+
+	def remove_enemy_units(self):
+		print("Removing enemy units...")
+		removed = self.document.run_operation("remove_enemy_units")
+		self.refresh_map_buildings()
+		self.populate_tree_view()
+		self.reset_search()
+		print(f"Enemy units removed. ({removed})")
+
+	def remove_enemy_buildings(self):
+		print("Removing enemy buildings...")
+		removed = self.document.run_operation("remove_enemy_buildings")
+		self.refresh_map_buildings()
+		self.populate_tree_view()
+		self.reset_search()
+		print(f"Enemy buildings removed. ({removed})")
+
+	def refresh_map_buildings(self):
+		# The document has already taken removed buildings out of the map grid, this just repaints it
+		grid = self.document.map_grid
+		self.map_model.tiles_changed(0, 0, grid.width - 1, grid.height - 1)
+
+	def unlock_all_research(self):
+		print("Unlocking all research...")
+		self.document.run_operation("unlock_all_research")
+		self.populate_tree_view()
+		print("All research unlocked.")
+
+	def remove_all_decryptors(self):
+		print("Removing all decryptors...")
+		removed = self.document.run_operation("remove_all_decryptors")
+		self.refresh_map_buildings()
+		self.populate_tree_view()
+		self.reset_search()
+		print(f"All decryptors removed. ({removed})")
+
+	def check_components(self, components, key, value):
+		for index, component in enumerate(components):
+			if component.get(key) == value:
+				return index
+		return -1
+
+	def cell_was_clicked(self, column, row):
+		self.selected_tile = (row, column)
+		self.ui.coordsDisplay.setText(f"{row},{column}")
+		document = self.document
+		resource = document.map_grid.get_resource(row, column)
+		if resource is not None:
+			self.ui.resourceInput.setText(" ".join(resource.split("_")[1:]).title())
+		else:
+			self.ui.resourceInput.setText("No resource selected")
+		decoration = document.map_grid.get_decoration(row, column)
+		decoration_index = 0
+		if decoration is not None:
+			decoration_index = self.ui.decorationInput.findData(decoration[0])
+			if decoration_index == -1:
+				# A kind we don't know, keep it selectable so Ctrl+Enter leaves it alone
+				self.ui.decorationInput.addItem(decoration[0], decoration[0])
+				decoration_index = self.ui.decorationInput.count() - 1
+		self.ui.decorationInput.setCurrentIndex(decoration_index)
+
+		building = document.map_edits.current(document.building_index.at(row, column))
+		if building is not None:
+			self.ui.buildingLabel.setText("Buliding: " + " ".join(building["EntityID"].split("_")[1:]).title())
+			self.ui.factionInput.setText(building["FactionID"].split("_")[1].capitalize())
+			self.ui.healthInput.setValue(0)
+		else:
+			self.ui.buildingLabel.setText("Building: No building selected")
+			self.ui.factionInput.setText("")
+			self.ui.healthInput.setValue(0)
+		
+		# TODO: Add some coments and make it look better since this is a mess
+		info = {}
+		if 'building' in locals() and building is not None and building.get("Components"):
+			if self.check_components(building["Components"], "Type", "ResourceModule") != -1:
+				i = self.check_components(building["Components"], "Type", "ResourceModule")
+				if building["Components"][i]["HasInputStorage"]:
+					inputStorage = building["Components"][i]["InputStorage"]
+					info["Input Storage:"] = str(inputStorage[0].get("Amount")) + " " + " ".join(inputStorage[0].get("ID").split("_")[1:]).title()
+				if building["Components"][i]["HasOutputStorage"]:
+					outputStorage = building["Components"][i]["OutputStorage"]
+					info["Output Storage:"] = str(outputStorage[0].get("Amount")) + " " + " ".join(outputStorage[0].get("ID").split("_")[1:]).title()
+			if self.check_components(building["Components"], "Type", "Turret") != -1:
+				i = self.check_components(building["Components"], "Type", "ResourceModule")
+				info["Barrel Rotation:"] = str(building["Components"][i].get("BarrelRotation"))
+				info["Cooldown:"] = str(building["Components"][i].get("Cooldown"))
+				targetModes = {0: "Default", 1: "Closest", 2: "Strongest", 3: "Weakest"}
+				targetMode = targetModes.get(building["Components"][i].get("TargetMode"))
+				info["Target Mode:"] = str(targetMode)
+			if self.check_components(building["Components"], "Type", "Decryptor") != -1:
+				i = self.check_components(building["Components"], "Type", "Decryptor")
+				info["Tech:"] = " ".join(building["Components"][i].get("TechID").split("_")[1:]).title()
+
+		for i in range(5):
+			label = getattr(self.ui, f"label{i+1}")
+			label.setText("")
+			input = getattr(self.ui, f"input{i+1}")
+			input.setVisible(False)
+
+		if len(info) != 0:
+			for index, key in enumerate(info):
+				label = getattr(self.ui, f"label{index+1}")
+				label.setText(key)
+				input = getattr(self.ui, f"input{index+1}")
+				input.setVisible(True)
+				input.setText(info[key])
+
+	def update_map_tile(self):
+		if self.selected_tile is None or self.load_thread is not None:
+			return
+		
+		map_edits = self.document.map_edits
+		# Get x and y of current cell
+		x, y = self.selected_tile
+		# Print for debugging
+		print(f"Updating tile {x},{y}")
+
+		# Update tile resource
+		resource_name = self.ui.resourceInput.toPlainText().title()
+		print(f"Resource: {resource_name}")
+
+		# If not showing "No resource selected" and resource is valid, update resource list
+		resource = "resource_" + resource_name.lower().replace(" ", "_")
+		if self.ui.resourceInput.toPlainText() != "No resource selected" and (resource in ref.resource_list or resource_name == ""):
+			if self.ui.resourceInput.toPlainText() == "":
+				map_edits.set_resource(x, y, None)
+			else:
+				map_edits.set_resource(x, y, resource)
+
+			# Only this cell gets repainted
+			self.map_model.tile_changed(x, y)
+		else:
+			print("Resource not valid")
+
+		# Changing the kind takes on the colours the region already uses for that kind
+		kind = self.ui.decorationInput.currentData()
+		decoration = self.document.map_grid.get_decoration(x, y)
+		if kind is None:
+			style = None
+		elif decoration is not None and decoration[0] == kind:
+			style = decoration
+		else:
+			style = self.document.map_grid.decoration_style(kind)
+		if map_edits.set_decoration(x, y, style):
+			self.map_model.tile_changed(x, y)
+
+		info = {}
+		building = self.document.building_index.at(x, y)
+		if building is None:
+			self.cell_was_clicked(y, x)
+			return
+		# Changes go on a copy until the map is written back
+		building = map_edits.edit_entity(building)
+
+		# Update faction
+		faction = self.ui.factionInput.toPlainText().lower()
+		if faction in ["redscar", "player"]:
+			faction = "faction_" + faction
+		elif faction in ["faction_redscar", "faction_player"]:
+			faction = faction
+		else:
+			faction = "faction_player"
+		building["FactionID"] = faction
+		
+		# TODO: Once health gets stored in save file, add some code for it. Should be pretty simple
+
+		# Get all attributes
+		for i in range(5):
+			label = getattr(self.ui, f"label{i+1}")
+			input = getattr(self.ui, f"input{i+1}")
+			if input.isVisible():
+				key = label.text().replace(" ", "").replace(":", "")
+				value = input.toPlainText()
+				info[key] = value
+		
+		for key in info:
+			value = info[key]
+			if key in ["InputStorage", "OutputStorage"]:
+				i = self.check_components(building["Components"], "Type", "ResourceModule")
+				# Fallback in case they put no resource. Should probably change this, but it works for now (hopefully)
+				if value == "":
+					value = "0 Gold"
+				value = [{"ID": "resource_" + value.split(" ")[1].lower(), "Amount": int(value.split(" ")[0])}]
+			elif key in ["BarrelRotation", "Cooldown", "TargetMode"]:
+				i = self.check_components(building["Components"], "Type", "Turret")
+				if key in ["BarrelRotation", "Cooldown"]:
+					value = float(value)
+				elif key in ["TargetMode"]:
+					targetModes = {'Default': 0, 'Closest': 1, 'Strongest': 2, 'Weakest': 3}
+					value = targetModes.get(value)
+					if value not in targetModes:
+						value = 0
+			building["Components"][i][key] = value
+
+		self.cell_was_clicked(y, x)
+
+	def on_tool_changed(self):
+		selecting = self.ui.toolInput.currentData() == "select"
+		# Painting shouldn't drag cells around or leave a trail of selection behind
+		self.ui.mapTable.setSelectionMode(QAbstractItemView.ExtendedSelection if selecting else QAbstractItemView.SingleSelection)
+		self.ui.mapTable.setDragEnabled(selecting)
+
+	def on_map_pressed(self, index):
+		tool = self.ui.toolInput.currentData()
+		grid = self.document.map_grid
+		x, y = index.column(), index.row()
+		if tool == "brush":
+			self.fill_tiles(map_tools.brush(grid, x, y, self.ui.brushSizeInput.value()))
+		elif tool == "flood":
+			resource, owner = self.fill_choice()
+			if resource is not None:
+				self.fill_tiles(map_tools.flood(grid.resource_codes, grid.width, x, y))
+			elif owner is not None:
+				# Only the owner changes, so spread over the buildings joined to this one
+				self.fill_tiles(map_tools.flood(grid.building_codes, grid.width, x, y, occupied=True))
+
+	def on_map_entered(self, index):
+		if self.ui.toolInput.currentData() == "brush" and QApplication.mouseButtons() & Qt.LeftButton:
+			self.fill_tiles(map_tools.brush(self.document.map_grid, index.column(), index.row(), self.ui.brushSizeInput.value()))
+
+	def fill_choice(self):
+		""" (resource, owner) the tools paint with. resource is None to keep it, "" to clear it, owner None to keep it """
+		return self.ui.fillResourceInput.currentData(), self.ui.fillOwnerInput.currentData()
+
+	def selected_tiles(self):
+		""" Offsets of every selected map cell, taken from the selection's rectangles rather than cell by cell """
+		grid = self.document.map_grid
+		offsets = []
+		for selection_range in self.ui.mapTable.selectionModel().selection():
+			offsets.extend(map_tools.rectangle(grid, selection_range.left(), selection_range.top(), selection_range.right(), selection_range.bottom()))
+		return offsets
+
+	def fill_selection(self):
+		self.fill_tiles(self.selected_tiles())
+
+	def clear_selection(self):
+		self.fill_tiles(self.selected_tiles(), resource="", owner=None)
+
+	def fill_tiles(self, offsets, **choice):
+		""" Paint many tiles as one batch: one pass through the map edits and one repaint of the area that changed.
+		Like a single tile edit it stays pending until the JSON is updated from the map """
+		if not offsets or self.load_thread is not None:
+			return
+		resource, owner = self.fill_choice()
+		resource = choice.get("resource", resource)
+		owner = choice.get("owner", owner)
+		document = self.document
+		with instrument.span("map.fill", tiles=len(offsets)) as args:
+			changed = []
+			if resource is not None:
+				changed = document.map_edits.fill_resource(offsets, resource or None)
+			owners = 0
+			if owner is not None:
+				owners = document.map_edits.set_owner(document.building_index.handles_in(offsets), owner)
+			args.update(changed=len(changed), owners=owners)
+		area = map_tools.bounds(document.map_grid, changed)
+		if area is not None:
+			self.map_model.tiles_changed(*area)
+		if self.selected_tile is not None:
+			x, y = self.selected_tile
+			self.cell_was_clicked(y, x)
+		self.ui.statusLabel.setText(f"Status: Painted {len(changed)} tiles and {owners} buildings, update JSON from map to keep them.")
+
+	def update_json_simple(self):
+		self.ui.statusLabel.setText("Status: Updating JSON from simple...")
+		QApplication.processEvents()
+		values = {}
+		values[('FileName',)] = self.ui.FilenameInput.toPlainText()
+		values[('Name',)] = self.ui.SavenameInput.toPlainText()
+		values[('Description',)] = self.ui.DescriptionInput.toPlainText()
+		values[('Version',)] = self.ui.VersionInput.toPlainText()
+		values[('WorldTime',)] = float(self.ui.PlaytimeInput.value())
+		values[('Seed',)] = int(self.ui.SeedInput.value())
+		
+		gamemode_index = self.ui.GamemodeInput.currentIndex()
+		gamemode_string = self.ui.GamemodeInput.itemText(gamemode_index)
+		values[('GamemodeData', 'ID')] = gamemode_string
+
+		region_index = self.ui.RegionInput.currentIndex()
+		region_string = self.ui.RegionInput.itemText(region_index)
+		values[('ActiveRegion',)] = region_string
+		# Only the fields that actually changed are written, as one step of undo
+		with instrument.span("update_json.simple") as args:
+			action = self.document.set_values("Simple editor", values)
+			args["values"] = len(action.changes) if action is not None else 0
+		self.ui.statusLabel.setText("Status: JSON updated from simple.")
+
+	def update_json_map(self):
+		self.ui.statusLabel.setText("Status: Updating JSON from map...")
+		QApplication.processEvents()
+
+		# Only tiles and buildings that were edited get written
+		with instrument.span("update_json.map") as args:
+			tiles_written, entities_written = self.document.apply_map_edits()
+			args.update(tiles=tiles_written, entities=entities_written)
+		instrument.count("tiles written", tiles_written)
+		instrument.count("entities written", entities_written)
+		print(f"Wrote {tiles_written} tiles and {entities_written} buildings from map.")
+		with instrument.span("update_json.map.tree_view"):
+			self.populate_tree_view()
+
+		self.ui.statusLabel.setText("Status: JSON updated from map.")
+
+	def update_json_manual(self):
+		self.ui.statusLabel.setText("Status: Updating JSON from manual...")
+		QApplication.processEvents()
+		model = self.ui.JsonTree.model()
+		if model is None:
+			return
+
+		# Only the values that were edited get written, straight into json_data and with their original types
+		with instrument.span("update_json.manual") as args:
+			applied = model.apply_edits()
+			self.document.record_changes("Manual edits", applied)
+			args["edits"] = len(applied)
+		# The document decodes an edited preview again, the minimap has to draw it
+		self.minimap.set_preview(self.document.preview_image)
+		instrument.count("manual edits applied", len(applied))
+		print(f"Applied {len(applied)} edits from manual.")
+		self.ui.statusLabel.setText("Status: JSON updated from manual.")
+
+	def undo(self):
+		if self.load_thread is not None:
+			return
+		action = self.document.undo()
+		if action is None:
+			self.ui.statusLabel.setText("Status: Nothing to undo.")
+			return
+		self.refresh_after_undo()
+		print(f"Undid {action.label} ({len(action.changes)} changes)")
+		self.ui.statusLabel.setText(f"Status: Undid {action.label}.")
+
+	def redo(self):
+		if self.load_thread is not None:
+			return
+		action = self.document.redo()
+		if action is None:
+			self.ui.statusLabel.setText("Status: Nothing to redo.")
+			return
+		self.refresh_after_undo()
+		print(f"Redid {action.label} ({len(action.changes)} changes)")
+		self.ui.statusLabel.setText(f"Status: Redid {action.label}.")
+
+	def refresh_after_undo(self):
+		# The document has already fixed its indexes, the views just need to show them again
+		self.populate_simple_view()
+		self.map_model.set_grid(self.document.map_grid)
+		self.minimap.set_preview(self.document.preview_image)
+		self.populate_tree_view()
+		self.reset_search()
+		if self.selected_tile is not None:
+			x, y = self.selected_tile
+			self.cell_was_clicked(y, x)
+
+	def compare_with_save(self):
+		if not self.document.is_loaded():
+			print("Import a save first.")
+			return
+		file_path, _ = QFileDialog.getOpenFileName(self, "Compare with SAV File", "", "SAV Files (*.sav)")
+		if not file_path:
+			return
+		self.ui.statusLabel.setText("Status: Comparing...")
+		QApplication.processEvents()
+		# The other save is the "before", what's open now (with any applied edits) is the "after"
+		try:
+			other_data, _ = save_io.load_save(file_path)
+			start = time.perf_counter()
+			changes, skipped = save_diff.diff_saves(other_data, self.document.json_data)
+			diff_time = (time.perf_counter() - start) * 1000
+		except Exception as e:
+			# Not a save, not gzip, cut short... either way the open save is untouched
+			print(f"Compare failed: {type(e).__name__}: {e}")
+			log_to_file(f"Compare failed: {type(e).__name__}: {e}")
+			self.ui.statusLabel.setText("Status: Compare failed.")
+			return
+		print(f"Compared in {diff_time:.1f} ms, {len(changes)} changes, {skipped} identical subtrees skipped")
+
+		lines = [f"{area}: {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed" for area, counts in save_diff.summarize(changes).items()]
+		lines.append("")
+		# A text box with a hundred thousand lines is slow to open, the full list is there from save_diff.py
+		lines.extend(save_diff.format_change(change) for change in changes[:2000])
+		if len(changes) > 2000:
+			lines.append(f"... and {len(changes) - 2000} more")
+
+		dialog = QDialog(self)
+		dialog.setWindowTitle(f"{os.path.basename(file_path)} -> open save: {len(changes)} changes")
+		dialog.resize(800, 500)
+		layout = QVBoxLayout(dialog)
+		text = QPlainTextEdit(dialog)
+		text.setReadOnly(True)
+		text.setLineWrapMode(QPlainTextEdit.NoWrap)
+		text.setPlainText("\n".join(lines) if changes else "No differences.")
+		layout.addWidget(text)
+		self.ui.statusLabel.setText(f"Status: {len(changes)} differences.")
+		dialog.exec()
+
+	def reload_editors(self):
+		if self.load_thread is not None:
+			print("Already loading, ignoring reload.")
+			return
+		self.ui.statusLabel.setText("Status: Reloading editors...")
+		self.start_load(json_data=self.document.json_data)
+
+	def export_json_data(self):
+		print("Outputing file...")
+		file_dialog = QFileDialog(self)
+		file_path, _ = file_dialog.getSaveFileName(self, "Save JSON File", self.ui.FilenameInput.toPlainText(), "SAV Files (*.sav)")
+		if file_path:
+			compact = self.ui.compactExportCheckBox.isChecked()
+			compresslevel = self.ui.compressionLevelInput.value()
+			# Written next to the target and renamed over it, so a crash never leaves half a save
+			with instrument.span("export", file=file_path, compact=compact, compresslevel=compresslevel) as args:
+				timings = self.document.export(file_path, compresslevel=compresslevel, compact=compact)
+				args.update({phase: round(seconds * 1000, 1) for phase, seconds in timings.items()})
+			print(f"Exported ({'compact' if compact else 'pretty'}, level {compresslevel}) | {save_io.format_timings(timings)}")
+			log_to_file(f"Export timings: {save_io.format_timings(timings)}")
+		print("File saved as " + file_path)
+
+	def export_trace(self):
+		file_dialog = QFileDialog(self)
+		file_path, _ = file_dialog.getSaveFileName(self, "Export Trace", "vecedit_trace.json", "Trace Files (*.json)")
+		if file_path:
+			events = instrument.tracer.export_chrome_trace(file_path)
+			print(f"Wrote {events} trace events to {file_path}")
+			self.ui.statusLabel.setText(f"Status: Trace written ({events} events).")
+
+	def set_snapshot_budget(self, megabytes):
+		self.snapshot_cache.budget_bytes = megabytes * 1024 * 1024
+		removed = self.snapshot_cache.evict()
+		if removed:
+			print(f"Removed {removed} snapshots to fit {megabytes} MB")
+
+	def clear_snapshots(self):
+		self.snapshot_cache.clear()
+		self.ui.statusLabel.setText("Status: Snapshots cleared.")
+
+	def reset_search(self):
+		# Handles from an old index mean nothing, so the results go whenever the index is rebuilt
+		self.ui.searchResults.clear()
+		self.ui.searchResultLabel.setText("No search yet")
+		self.ui.searchRegionInput.clear()
+		self.ui.searchRegionInput.addItem("Any region")
+		self.ui.searchRegionInput.addItems(sorted(self.document.region_ids()))
+
+	def search_terms(self, text, prefix="", known=None):
+		""" Comma separated names from a search box, None if it's empty. "redscar" becomes "faction_redscar" and so on """
+		terms = set()
+		for term in text.split(","):
+			term = term.strip().lower().replace(" ", "_")
+			if not term:
+				continue
+			if known is not None:
+				# Component types are CamelCase in the save, match them without caring about case
+				term = known.get(term, term)
+			elif not term.startswith(prefix):
+				term = prefix + term
+			terms.add(term)
+		return terms or None
+
+	def run_search(self):
+		index = self.document.entity_index
+		region = None
+		if self.ui.searchRegionInput.currentIndex() > 0:
+			region = self.ui.searchRegionInput.currentText()
+		area = None
+		if self.ui.searchAreaCheckBox.isChecked():
+			region = region or self.document.map_region
+			x0, x1 = sorted((self.ui.searchX0Input.value(), self.ui.searchX1Input.value()))
+			y0, y1 = sorted((self.ui.searchY0Input.value(), self.ui.searchY1Input.value()))
+			area = (x0, y0, x1, y1)
+
+		# Regions go in the search index the first time they're shown or searched
+		added = self.document.make_searchable(region)
+		if added:
+			print(f"Indexed {added} more regions for search")
+
+		start = time.perf_counter()
+		handles = index.search(
+			region=region,
+			entity_ids=self.search_terms(self.ui.searchEntityInput.text(), "vec_"),
+			factions=self.search_terms(self.ui.searchFactionInput.text(), "faction_"),
+			component_types=self.search_terms(self.ui.searchComponentInput.text(), known={key.lower(): key for key in index.by_component}),
+			resources=self.search_terms(self.ui.searchResourceInput.text(), "resource_"),
+			storage=self.search_terms(self.ui.searchStorageInput.text(), "resource_"),
+			area=area)
+		search_time = (time.perf_counter() - start) * 1000
+
+		# Only the first few thousand go in the list, a list widget that big is slower than the search
+		self.ui.searchResults.clear()
+		for handle in handles[:5000]:
+			entity = index.entities[handle]
+			tile = index.tiles[handle]
+			where = f"{tile[0]},{tile[1]}" if tile is not None else "no position"
+			item = QListWidgetItem(f"{entity.get('EntityID')} ({entity.get('FactionID')}) at {where} in {index.regions[handle]}")
+			item.setData(Qt.UserRole, handle)
+			self.ui.searchResults.addItem(item)
+		shown = f", showing {min(len(handles), 5000)}" if len(handles) > 5000 else ""
+		self.ui.searchResultLabel.setText(f"{len(handles)} found in {search_time:.1f} ms{shown}")
+
+	def selected_result(self):
+		item = self.ui.searchResults.currentItem()
+		if item is None:
+			return 0
+		return item.data(Qt.UserRole)
+
+	def show_result_on_map(self):
+		handle = self.selected_result()
+		if not handle:
+			return
+		index = self.document.entity_index
+		if index.tiles[handle] is None:
+			# No position to show, it can still be found in the tree
+			self.show_result_in_tree()
+			return
+		x, y = index.tiles[handle]
+		# Goes through switch_map_region if it's in another region
+		self.ui.mapRegionInput.setCurrentText(index.regions[handle])
+		self.ui.Tabs.setCurrentWidget(self.ui.MapTab)
+		self.jump_to_tile(x, y)
+		self.ui.mapTable.setCurrentIndex(self.map_model.index(y, x))
+		self.cell_was_clicked(y, x)
+
+	def show_result_in_tree(self):
+		handle = self.selected_result()
+		model = self.ui.JsonTree.model()
+		if not handle or model is None:
+			return
+		path = self.document.entity_index.tree_path(handle, self.document.json_data)
+		if path is None:
+			print("That entity isn't in the save any more.")
+			return
+		tree_index = model.index_for_path(path)
+		self.ui.Tabs.setCurrentWidget(self.ui.ManualEditorTab)
+		# scrollTo expands the parents on its way
+		self.ui.JsonTree.scrollTo(tree_index, QAbstractItemView.PositionAtTop)
+		self.ui.JsonTree.setCurrentIndex(tree_index)
+		self.ui.JsonTree.expand(tree_index)
+
+	def jump_to_tile(self, x, y):
+		self.ui.mapTable.scrollTo(self.map_model.index(y, x), QAbstractItemView.PositionAtCenter)
+
+	def update_minimap_view(self):
+		viewport = self.ui.mapTable.viewport()
+		x = self.ui.mapTable.columnAt(0)
+		y = self.ui.mapTable.rowAt(0)
+		self.minimap.set_view_rect(max(x, 0), max(y, 0), viewport.width() // self.cell_size, viewport.height() // self.cell_size)
+
+	def update_cell_size(self):
+		self.ui.mapTable.verticalHeader().setDefaultSectionSize(self.cell_size)
+		self.ui.mapTable.horizontalHeader().setDefaultSectionSize(self.cell_size)
+		self.ui.mapTable.setIconSize(QSize(self.cell_size, self.cell_size))
+		self.update_minimap_view()
+		print("Cell size: " + str(self.cell_size))
+
+	def on_tab_changed(self, index):
+		# Enable shortcuts only if the current tab is the second tab
+		if self.ui.Tabs.currentWidget() == self.ui.MapTab:
+			self.zoom_in_shortcut.setEnabled(True)
+			self.zoom_out_shortcut.setEnabled(True)
+			self.map_update_shortcut.setEnabled(True)
+		else:
+			self.zoom_in_shortcut.setEnabled(False)
+			self.zoom_out_shortcut.setEnabled(False)
+			self.map_update_shortcut.setEnabled(False)
+
+	def zoom_in(self):
+		print("Zooming in")
+		if self.cell_size < 10:
+			self.cell_size = next(size for size in SMALL_CELL_SIZES + [10] if size > self.cell_size)
+		else:
+			self.cell_size += 5
+		self.update_cell_size()
+
+	def zoom_out(self):
+		if self.cell_size > 10:
+			print("Zooming out")
+			self.cell_size -= 5
+		elif self.cell_size > SMALL_CELL_SIZES[0]:
+			# Below 10 px the map is drawn a pixel per tile, down to the whole map on screen at 1 px
+			print("Zooming out")
+			self.cell_size = max(size for size in SMALL_CELL_SIZES if size < self.cell_size)
+		else:
+			return
+		self.update_cell_size()
+
+def run(argv):
+	global loader
+	global app
+	log.reset()
+	# Every span also goes in the log, and the totals are written when the window closes
+	instrument.tracer.log = log_to_file
+	loader = QUiLoader()
+	app = QApplication(argv)
+	window = MainWindow()
+	if detect_dark_mode():
+		app.setStyleSheet(ref.dark_stylesheet)
+	else:
+		app.setStyleSheet(ref.light_stylesheet)
+	window.show()
+	result = app.exec()
+	for line in instrument.tracer.summary():
+		log_to_file(f"[summary] {line}")
+	log.flush()
+	return result
@@ -0,0 +1,102 @@
+import os
+import zlib
+from collections import OrderedDict
+from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import QColor, QFont, QPainter, QPixmap
+
+def fallback_color(asset_id):
+	""" Fixed per asset, so a tile without an image always looks the same """
+	return QColor.fromHsv(zlib.crc32(asset_id.encode()) % 360, 140, 150)
+
+class IconCache:
+	""" Tile images keyed by (asset id, size). Each PNG is decoded once per process, scaled copies are kept
+	in least recently used order until they go over budget_bytes. Assets without a PNG get a generated tile """
+	def __init__(self, image_dir, budget_bytes=32 * 1024 * 1024):
+		self.image_dir = image_dir
+		self.budget_bytes = budget_bytes
+		# asset id -> QPixmap, or None if there's no image for it
+		self.sources = {}
+		self.scaled = OrderedDict()
+		self.scaled_bytes = 0
+		# asset id -> 0xAARRGGBB it's drawn as when tiles are too small for images
+		self.colors = {}
+		self.hits = 0
+		self.misses = 0
+
+	def source(self, asset_id):
+		if asset_id not in self.sources:
+			path = os.path.join(self.image_dir, asset_id + ".png")
+			pixmap = QPixmap(path) if os.path.exists(path) else None
+			if pixmap is not None and pixmap.isNull():
+				print(f"Couldn't decode {path}")
+				pixmap = None
+			self.sources[asset_id] = pixmap
+		return self.sources[asset_id]
+
+	def has_image(self, asset_id):
+		return self.source(asset_id) is not None
+
+	def pixmap(self, asset_id, width, height=None):
+		if height is None:
+			height = width
+		key = (asset_id, width, height)
+		pixmap = self.scaled.get(key)
+		if pixmap is not None:
+			self.scaled.move_to_end(key)
+			self.hits += 1
+			return pixmap
+
+		self.misses += 1
+		source = self.source(asset_id)
+		if source is not None:
+			pixmap = source.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+		else:
+			pixmap = self.make_fallback(asset_id, width, height)
+		self.scaled[key] = pixmap
+		self.scaled_bytes += width * height * 4
+		while self.scaled_bytes > self.budget_bytes and len(self.scaled) > 1:
+			(_, old_width, old_height), _ = self.scaled.popitem(last=False)
+			self.scaled_bytes -= old_width * old_height * 4
+		return pixmap
+
+	def color(self, asset_id):
+		""" One colour that stands for an asset: its image averaged down to a pixel, or the fallback tile's colour """
+		color = self.colors.get(asset_id)
+		if color is None:
+			source = self.source(asset_id)
+			if source is not None:
+				average = source.toImage().scaled(1, 1, Qt.IgnoreAspectRatio, Qt.SmoothTransformation).pixelColor(0, 0)
+				average.setAlpha(255)
+			else:
+				average = fallback_color(asset_id)
+			color = self.colors[asset_id] = average.rgba()
+		return color
+
+	def make_fallback(self, asset_id, width, height):
+		""" A coloured tile with the start of the name on it, the colour is fixed per asset """
+		short_name = asset_id.split("_", 1)[-1]
+		pixmap = QPixmap(width, height)
+		pixmap.fill(Qt.transparent)
+		painter = QPainter(pixmap)
+		painter.fillRect(QRect(1, 1, width - 2, height - 2), fallback_color(asset_id))
+		if width >= 12:
+			font = QFont()
+			font.setPixelSize(max(height // 3, 6))
+			painter.setFont(font)
+			painter.setPen(Qt.white)
+			painter.drawText(QRect(0, 0, width, height), Qt.AlignCenter, short_name[:4])
+		painter.end()
+		return pixmap
+
+	def clear_scaled(self):
+		self.scaled.clear()
+		self.scaled_bytes = 0
+
+_shared_cache = None
+
+def shared_cache(image_dir=None):
+	""" The process-wide cache. image_dir is only used the first time """
+	global _shared_cache
+	if _shared_cache is None:
+		_shared_cache = IconCache(image_dir)
+	return _shared_cache
@@ -0,0 +1,138 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Timing spans, counters and a buffered log. No Qt, so the load worker and batch tools can use it too.
+# Everything goes into the one process-wide tracer, which can be written out as a Chrome trace
+# (open it in chrome://tracing or https://ui.perfetto.dev) to see where a slow save spent its time.
+
+class BufferedLog:
+	""" Lines for a log file, written out in batches instead of opening the file for every line """
+	def __init__(self, path, max_lines=100, max_seconds=2.0):
+		self.path = path
+		self.max_lines = max_lines
+		self.max_seconds = max_seconds
+		self.lines = []
+		self.last_flush = time.monotonic()
+		self.lock = threading.Lock()
+		atexit.register(self.flush)
+
+	def write(self, text):
+		with self.lock:
+			self.lines.append(f"{text}\n")
+			if len(self.lines) < self.max_lines and time.monotonic() - self.last_flush < self.max_seconds:
+				return
+		self.flush()
+
+	def flush(self):
+		with self.lock:
+			lines = self.lines
+			self.lines = []
+			self.last_flush = time.monotonic()
+		if lines:
+			with open(self.path, "a") as file:
+				file.writelines(lines)
+
+	def reset(self):
+		""" Drop anything buffered and start the file over """
+		with self.lock:
+			self.lines = []
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+class Tracer:
+	""" Collects spans (name, start, duration, thread) and counters as Chrome trace events """
+	def __init__(self, max_events=200000):
+		self.origin = time.perf_counter()
+		self.max_events = max_events
+		self.events = []
+		self.counters = {}
+		# name -> [calls, total seconds, longest seconds]
+		self.totals = {}
+		self.thread_names = {}
+		self.lock = threading.Lock()
+		self.log = None
+
+	def microseconds(self, perf_time):
+		return (perf_time - self.origin) * 1000000
+
+	def add_event(self, event):
+		with self.lock:
+			# Past the cap only the totals keep counting, so a long session can't eat memory
+			if len(self.events) < self.max_events:
+				self.events.append(event)
+
+	def record(self, name, start, end, **args):
+		""" A span that was timed some other way, e.g. one that starts and ends in different slots """
+		duration = end - start
+		thread = threading.current_thread()
+		self.thread_names.setdefault(thread.ident, thread.name)
+		event = {"name": name, "ph": "X", "ts": self.microseconds(start), "dur": duration * 1000000,
+			"pid": os.getpid(), "tid": thread.ident}
+		if args:
+			event["args"] = args
+		self.add_event(event)
+		with self.lock:
+			totals = self.totals.setdefault(name, [0, 0.0, 0.0])
+			totals[0] += 1
+			totals[1] += duration
+			totals[2] = max(totals[2], duration)
+		if self.log is not None:
+			self.log(f"[span] {name}: {duration * 1000:.1f} ms{' ' + json.dumps(args) if args else ''}")
+		return duration
+
+	@contextmanager
+	def span(self, name, **args):
+		""" with tracer.span("load.parse", file=path): ... """
+		start = time.perf_counter()
+		try:
+			yield args
+		finally:
+			# args can be filled in inside the block, e.g. with how many things it did
+			self.record(name, start, time.perf_counter(), **args)
+
+	def count(self, name, amount=1):
+		""" Add to a counter. Counters show up as graphs in the trace """
+		with self.lock:
+			value = self.counters.get(name, 0) + amount
+			self.counters[name] = value
+		self.add_event({"name": name, "ph": "C", "ts": self.microseconds(time.perf_counter()), "pid": os.getpid(), "args": {name: value}})
+
+	def set_counter(self, name, value):
+		with self.lock:
+			self.counters[name] = value
+		self.add_event({"name": name, "ph": "C", "ts": self.microseconds(time.perf_counter()), "pid": os.getpid(), "args": {name: value}})
+
+	def summary(self):
+		""" One line per span name, slowest total first """
+		lines = []
+		for name, (calls, total, longest) in sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True):
+			lines.append(f"{name}: {calls}x, {total * 1000:.1f} ms total, {longest * 1000:.1f} ms longest")
+		for name, value in sorted(self.counters.items()):
+			lines.append(f"{name} = {value}")
+		return lines
+
+	def export_chrome_trace(self, path):
+		""" Write everything recorded so far in Chrome's trace event format. Returns how many events were written """
+		with self.lock:
+			events = list(self.events)
+			thread_names = dict(self.thread_names)
+		metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}} for tid, name in thread_names.items()]
+		with open(path, "w", encoding="utf-8") as file:
+			json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": {"counters": self.counters}}, file)
+		return len(events)
+
+	def clear(self):
+		with self.lock:
+			self.events = []
+			self.counters = {}
+			self.totals = {}
+
+tracer = Tracer()
+span = tracer.span
+record = tracer.record
+count = tracer.count
+set_counter = tracer.set_counter
@@ -0,0 +1,229 @@
+import json
+from PySide6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PySide6.QtGui import QFont
+import entity_store
+
+# How many children fetchMore adds at a time
+FETCH_BATCH_SIZE = 256
+
+def get_at_path(data, path):
+	for key in path:
+		data = data[key]
+	return data
+
+def set_at_path(data, path, value):
+	entity_store.writable(data, path[:-1])[path[-1]] = value
+
+def format_value(value):
+	""" How a scalar is shown in the Value column. Uses JSON spelling so it can be typed back in """
+	if value is None or isinstance(value, bool):
+		return json.dumps(value)
+	return str(value)
+
+def parse_value(text, original):
+	""" Turn edited text back into the same type the value had. Raises ValueError if it doesn't fit """
+	if isinstance(original, bool):
+		if text.strip().lower() in ("true", "false"):
+			return text.strip().lower() == "true"
+		raise ValueError(f"expected true or false, got {text!r}")
+	if isinstance(original, int):
+		return int(text)
+	if isinstance(original, float):
+		return float(text)
+	if original is None:
+		# null can become anything, so read it as JSON and fall back to a plain string
+		if text.strip() in ("", "null", "None"):
+			return None
+		try:
+			return json.loads(text)
+		except ValueError:
+			return text
+	return text
+
+class JsonNode:
+	""" One row of the tree. Children are only made when the row is expanded """
+	__slots__ = ("parent", "key", "row", "children")
+
+	def __init__(self, parent, key, row):
+		self.parent = parent
+		self.key = key
+		self.row = row
+		self.children = []
+
+	def path(self):
+		path = []
+		node = self
+		while node.parent is not None:
+			path.append(node.key)
+			node = node.parent
+		return tuple(reversed(path))
+
+class JsonTreeModel(QAbstractItemModel):
+	""" Key/Value tree straight over json_data. Rows are made lazily through canFetchMore/fetchMore """
+	def __init__(self, json_data, parent=None):
+		super(JsonTreeModel, self).__init__(parent)
+		self.json_data = json_data
+		self.root = JsonNode(None, None, 0)
+		# Dirty paths: path -> new value (already the right type), written by apply_edits()
+		self.edits = {}
+		self.edited_nodes = {}
+
+	def node_from_index(self, index):
+		if index.isValid():
+			return index.internalPointer()
+		return self.root
+
+	def value_of(self, node):
+		if node.parent is None:
+			return self.json_data
+		return get_at_path(self.json_data, node.path())
+
+	def index(self, row, column, parent=QModelIndex()):
+		if not self.hasIndex(row, column, parent):
+			return QModelIndex()
+		parent_node = self.node_from_index(parent)
+		return self.createIndex(row, column, parent_node.children[row])
+
+	def parent(self, index):
+		if not index.isValid():
+			return QModelIndex()
+		parent_node = index.internalPointer().parent
+		if parent_node is None or parent_node.parent is None:
+			return QModelIndex()
+		return self.createIndex(parent_node.row, 0, parent_node)
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.column() > 0:
+			return 0
+		return len(self.node_from_index(parent).children)
+
+	def columnCount(self, parent=QModelIndex()):
+		return 2
+
+	def hasChildren(self, parent=QModelIndex()):
+		if parent.column() > 0:
+			return False
+		value = self.value_of(self.node_from_index(parent))
+		return isinstance(value, (dict, list)) and len(value) > 0
+
+	def canFetchMore(self, parent):
+		if parent.column() > 0:
+			return False
+		node = self.node_from_index(parent)
+		value = self.value_of(node)
+		return isinstance(value, (dict, list)) and len(node.children) < len(value)
+
+	def fetchMore(self, parent):
+		node = self.node_from_index(parent)
+		value = self.value_of(node)
+		start = len(node.children)
+		end = min(start + FETCH_BATCH_SIZE, len(value))
+		if isinstance(value, dict):
+			keys = list(value.keys())[start:end]
+		else:
+			keys = range(start, end)
+
+		self.beginInsertRows(parent, start, end - 1)
+		for row, key in enumerate(keys, start):
+			node.children.append(JsonNode(node, key, row))
+		self.endInsertRows()
+
+	def index_for_path(self, path):
+		""" The index of the row at path, fetching just enough rows on the way down. Invalid if it isn't there """
+		index = QModelIndex()
+		node = self.root
+		for key in path:
+			value = self.value_of(node)
+			if isinstance(value, dict):
+				if key not in value:
+					return QModelIndex()
+				row = list(value.keys()).index(key)
+			elif isinstance(value, list) and isinstance(key, int) and 0 <= key < len(value):
+				row = key
+			else:
+				return QModelIndex()
+			while len(node.children) <= row:
+				self.fetchMore(index)
+			node = node.children[row]
+			index = self.createIndex(row, 0, node)
+		return index
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		node = index.internalPointer()
+		if role == Qt.FontRole:
+			# Pending edits show in bold until they're applied
+			if node.path() in self.edits:
+				font = QFont()
+				font.setBold(True)
+				return font
+			return None
+		if role not in (Qt.DisplayRole, Qt.EditRole):
+			return None
+		if index.column() == 0:
+			if isinstance(node.key, int):
+				return f"[{node.key}]"
+			return node.key
+
+		path = node.path()
+		if path in self.edits:
+			return format_value(self.edits[path])
+		value = get_at_path(self.json_data, path)
+		if isinstance(value, (dict, list)):
+			return ""
+		return format_value(value)
+
+	def setData(self, index, value, role=Qt.EditRole):
+		if role != Qt.EditRole or index.column() != 1:
+			return False
+		node = index.internalPointer()
+		path = node.path()
+		original = get_at_path(self.json_data, path)
+		try:
+			new_value = parse_value(value, original)
+		except ValueError as e:
+			print(f"Edit rejected at {'/'.join(map(str, path))}: {e}")
+			return False
+
+		if new_value == original and type(new_value) is type(original):
+			self.edits.pop(path, None)
+			self.edited_nodes.pop(path, None)
+		else:
+			self.edits[path] = new_value
+			self.edited_nodes[path] = node
+		key_index = index.siblingAtColumn(0)
+		self.dataChanged.emit(key_index, index)
+		return True
+
+	def flags(self, index):
+		if not index.isValid():
+			return Qt.NoItemFlags
+		flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+		if index.column() == 1 and not isinstance(self.value_of(index.internalPointer()), (dict, list)):
+			flags |= Qt.ItemIsEditable
+		return flags
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+			return ["Key", "Value"][section]
+		return None
+
+	def apply_edits(self):
+		""" Write the dirty paths into json_data in place and clear them. Returns (path, old value, new value) for each write """
+		applied = []
+		for path, value in self.edits.items():
+			try:
+				old = get_at_path(self.json_data, path)
+				set_at_path(self.json_data, path, value)
+			except (KeyError, IndexError, TypeError):
+				print(f"Skipping edit, {'/'.join(map(str, path))} no longer exists")
+				continue
+			applied.append((path, old, value))
+		edited_nodes = self.edited_nodes
+		self.edits = {}
+		self.edited_nodes = {}
+		# Only the bold font goes away, the values are already showing
+		for node in edited_nodes.values():
+			self.dataChanged.emit(self.createIndex(node.row, 0, node), self.createIndex(node.row, 1, node))
+		return applied
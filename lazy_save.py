@@ -0,0 +1,376 @@
+import copy
+import gc
+import json
+import entity_store
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+# Loading a save without parsing all of it. The region fields that are most of the file (resources, entities,
+# worldFeatures, decorations, preview) are kept as the exact bytes they were read from and only parsed when something
+# first reads them. Exporting copies every field that hasn't changed since straight back out, so a session that
+# only touches the header and one region doesn't pay to parse or re-serialize the rest, and untouched values keep
+# the game's own float spelling.
+#
+# Splitting is done on the compact JSON the game writes, without a tokenizer: a literal `,"entities":` can only be a
+# key (any quote inside a string is escaped), and every region starts with `"<id>":{"ID":"<id>"`. Each split is
+# checked by counting brackets and by parsing what's left around it, and anything that doesn't check out (pretty
+# printed saves, fields in surprising places) is parsed the normal way instead.
+
+# Region fields that are left unparsed
+LAZY_FIELDS = ("resources", "entities", "worldFeatures", "decorations", "preview")
+# Fields that get entity_store compaction when they're parsed
+COMPACTED_FIELDS = ("entities", "worldFeatures")
+# Anything shorter costs more to keep track of than to parse
+MIN_LAZY_BYTES = 4096
+
+REGIONS_KEY = b'"regions":'
+REGION_ID = b'":{"ID":"'
+CLOSING = {ord("{"): ord("}"), ord("["): ord("]")}
+
+def _parse(data):
+	if orjson is not None:
+		return orjson.loads(data)
+	return json.loads(data)
+
+def _dumps(value):
+	if orjson is not None:
+		return orjson.dumps(value)
+	return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class RawValue:
+	""" A value still in JSON form. data is the exact bytes it was read from, value is set once it's parsed """
+	__slots__ = ("data", "value")
+
+	def __init__(self, data, value=None):
+		self.data = data
+		self.value = value
+
+	def parse(self, compact=False):
+		if self.value is None:
+			# Like a whole save, a freshly parsed subtree is all live objects, no use letting the collector walk it
+			gc_was_enabled = gc.isenabled()
+			gc.disable()
+			try:
+				value = _parse(self.data)
+				if compact:
+					entity_store.compact_section(value)
+			finally:
+				if gc_was_enabled:
+					gc.enable()
+			self.value = value
+		return self.value
+
+	def __reduce__(self):
+		return (RawValue, (self.data, self.value))
+
+class LazyDict(dict):
+	""" A region whose big fields are RawValues until they're first read, then the parsed value takes their place.
+	Reads through the usual dict methods never see a RawValue. Only code that walks the dict's storage itself does,
+	like orjson, which is why export goes through dump() """
+	__slots__ = ("sources", "changed", "compact")
+
+	def __init__(self, *args, compact=False, **kwargs):
+		super(LazyDict, self).__init__(*args, **kwargs)
+		# key -> the RawValue it was read from, kept after parsing so an unchanged value can be written out as it was
+		self.sources = {}
+		# Keys whose value was changed in place, see mark_changed()
+		self.changed = set()
+		self.compact = compact
+
+	def set_raw(self, key, data):
+		raw = RawValue(data)
+		self.sources[key] = raw
+		dict.__setitem__(self, key, raw)
+
+	def _parsed(self, key, value):
+		if type(value) is RawValue:
+			value = value.parse(self.compact and key in COMPACTED_FIELDS)
+			dict.__setitem__(self, key, value)
+		return value
+
+	def is_parsed(self, key):
+		return type(dict.get(self, key)) is not RawValue
+
+	def parse_all(self):
+		for key, value in dict.items(self):
+			if type(value) is RawValue:
+				self._parsed(key, value)
+
+	def verbatim(self, key):
+		""" The bytes key was read from if its value is still exactly that, else None """
+		source = self.sources.get(key)
+		if source is None or key in self.changed:
+			return None
+		value = dict.get(self, key)
+		if value is source or (value is source.value and value is not None):
+			return source.data
+		return None
+
+	def __getitem__(self, key):
+		return self._parsed(key, dict.__getitem__(self, key))
+
+	def get(self, key, default=None):
+		if key in self:
+			return self[key]
+		return default
+
+	def setdefault(self, key, default=None):
+		if key in self:
+			return self[key]
+		self[key] = default
+		return default
+
+	def pop(self, key, *default):
+		if key in self:
+			self[key]
+		return dict.pop(self, key, *default)
+
+	def popitem(self):
+		self.parse_all()
+		return dict.popitem(self)
+
+	def items(self):
+		self.parse_all()
+		return dict.items(self)
+
+	def values(self):
+		self.parse_all()
+		return dict.values(self)
+
+	def copy(self):
+		return dict(self.items())
+
+	def __eq__(self, other):
+		self.parse_all()
+		if isinstance(other, LazyDict):
+			other.parse_all()
+		return dict.__eq__(self, other)
+
+	def __ne__(self, other):
+		result = self.__eq__(other)
+		return result if result is NotImplemented else not result
+
+	__hash__ = None
+
+	def __deepcopy__(self, memo):
+		# Copies are for changing, so they come back as plain dicts
+		return copy.deepcopy(dict(self.items()), memo)
+
+	def __reduce__(self):
+		return (LazyDict, (), (self.sources, self.changed, self.compact), None, iter(dict.items(self)))
+
+	def __setstate__(self, state):
+		self.sources, self.changed, self.compact = state
+
+def _is_value(raw, start, end):
+	""" Whether raw[start:end] looks like one whole object or array: matching brackets at the ends and as many { as }.
+	A split in the wrong place is always at a key inside an object that's still open, so the braces are enough.
+	Brackets inside strings aren't told apart, the parse around it catches what this misses """
+	if end - start < 2 or CLOSING.get(raw[start]) != raw[end - 1]:
+		return False
+	return raw.count(b"{", start, end) == raw.count(b"}", start, end)
+
+def _value_end(raw, start):
+	""" Where the object or array at start ends, found by where the bracket depth first gets back to 0.
+	Probes further and further out, then narrows down, so it costs about the size of the value. None if it isn't found """
+	def depth(end):
+		return raw.count(b"{", start, end) + raw.count(b"[", start, end) - raw.count(b"}", start, end) - raw.count(b"]", start, end)
+
+	low = start + 1
+	step = 1024
+	high = min(start + step, len(raw))
+	while depth(high) > 0:
+		if high == len(raw):
+			return None
+		low = high
+		step *= 2
+		high = min(start + step, len(raw))
+	while low < high:
+		middle = (low + high) // 2
+		if depth(middle) > 0:
+			low = middle + 1
+		else:
+			high = middle
+	return low
+
+def _find_key(raw, key, start, end):
+	""" Where ,"key": is between start and end, or None """
+	position = raw.find(b',"' + key + b'":', start, end)
+	return None if position == -1 else position
+
+def _region_starts(raw, start):
+	""" (key start, value start, region id) of each "<id>":{"ID":"<id>" after start """
+	position = raw.find(REGION_ID, start)
+	while position != -1:
+		key_start = raw.rfind(b'"', start, position)
+		region_id = raw[key_start + 1:position]
+		value_start = position + 2
+		if key_start != -1 and b"\\" not in region_id and raw.startswith(b'{"ID":"' + region_id + b'"', value_start):
+			yield key_start, value_start, region_id
+		position = raw.find(REGION_ID, position + 1)
+
+def _split_region(raw, start, end, compact):
+	""" The region whose object starts at start as a LazyDict. end is where it ends, or None to find it from its
+	last field. Returns (region, end) or None if it can't be split """
+	limit = len(raw) if end is None else end
+	fields = []
+	# Fields are usually in this order, so each search picks up where the last one found something.
+	# A key that's also used deeper down can be found in the wrong place, the bracket counts below catch that
+	cursor = start
+	for key in LAZY_FIELDS:
+		position = _find_key(raw, key.encode(), cursor, limit)
+		if position is None and cursor != start:
+			position = _find_key(raw, key.encode(), start, cursor)
+		if position is not None:
+			fields.append((position, key))
+			cursor = max(cursor, position)
+	if not fields:
+		return None
+	fields.sort()
+
+	spans = []
+	for number, (position, key) in enumerate(fields):
+		value_start = position + len(key) + 4
+		if number + 1 < len(fields):
+			value_end = fields[number + 1][0]
+		elif end is not None:
+			value_end = end - 1
+		else:
+			value_end = _value_end(raw, value_start)
+			if value_end is None:
+				return None
+			end = value_end + 1
+		if not _is_value(raw, value_start, value_end):
+			return None
+		spans.append((key, value_start, value_end))
+	if raw[end - 1] != ord("}"):
+		return None
+
+	# Parse the region with its big fields blanked out, which also checks the split
+	pieces = []
+	previous = start
+	lazy = []
+	for key, value_start, value_end in spans:
+		if value_end - value_start >= MIN_LAZY_BYTES:
+			pieces.append(raw[previous:value_start])
+			pieces.append(b"null")
+			previous = value_end
+			lazy.append((key, value_start, value_end))
+	pieces.append(raw[previous:end])
+	try:
+		skeleton = _parse(b"".join(pieces))
+	except ValueError:
+		return None
+	if type(skeleton) is not dict or any(skeleton.get(key, False) is not None for key, _, _ in lazy):
+		return None
+
+	region = LazyDict(skeleton, compact=compact)
+	for key, value_start, value_end in lazy:
+		region.set_raw(key, raw[value_start:value_end])
+	if compact:
+		for key in COMPACTED_FIELDS:
+			if region.is_parsed(key):
+				entity_store.compact_section(region.get(key))
+	return region, end
+
+def loads(raw, compact=False):
+	""" Parse save bytes, leaving each region's big fields unparsed until they're read.
+	compact is passed on to entity_store when entities are parsed. Returns None if the save isn't laid out the way
+	this expects, the caller should parse it whole then """
+	# Anything else called "regions" would have to be nested in the few small values before it,
+	# and parsing the top level afterwards would notice
+	key_position = raw.find(REGIONS_KEY)
+	if key_position <= 0 or raw[key_position - 1] not in b"{,":
+		return None
+	regions_start = key_position + len(REGIONS_KEY)
+	if raw[regions_start:regions_start + 1] != b"{":
+		return None
+
+	starts = list(_region_starts(raw, regions_start))
+	if not starts or starts[0][0] != regions_start + 1:
+		return None
+	regions = {}
+	for number, (key_start, value_start, region_id) in enumerate(starts):
+		end = None
+		if number + 1 < len(starts):
+			end = starts[number + 1][0] - 1
+			if raw[end] != ord(","):
+				return None
+		split = _split_region(raw, value_start, end, compact)
+		if split is not None:
+			region, end = split
+		elif end is not None:
+			try:
+				region = _parse(raw[value_start:end])
+			except ValueError:
+				return None
+			if type(region) is not dict:
+				return None
+			if compact:
+				for key in COMPACTED_FIELDS:
+					entity_store.compact_section(region.get(key))
+		else:
+			return None
+		region_id = region_id.decode("utf-8")
+		if region_id in regions:
+			return None
+		regions[region_id] = region
+	regions_end = end + 1
+	if raw[end:regions_end] != b"}":
+		return None
+
+	# Everything outside "regions" is small, parse it with an empty regions object in its place
+	try:
+		json_data = _parse(raw[:regions_start] + b"{}" + raw[regions_end:])
+	except ValueError:
+		return None
+	if type(json_data) is not dict or json_data.get("regions") != {}:
+		return None
+	json_data["regions"] = regions
+	return json_data
+
+def is_lazy(json_data):
+	return any(type(region) is LazyDict for region in json_data.get("regions", {}).values())
+
+def mark_changed(json_data, path):
+	""" Note that something inside the region field at path was changed in place, so export serializes it again.
+	Replacing a whole field needs no note, export sees it's not the object that was read """
+	if len(path) < 4 or path[0] != "regions":
+		return
+	region = json_data.get("regions", {}).get(path[1])
+	if type(region) is LazyDict:
+		region.changed.add(path[2])
+
+def dump(json_data, write):
+	""" Write json_data as compact JSON through write(), the same bytes orjson.dumps or the json module would give.
+	Region fields that haven't changed since they were loaded are copied out as they were read """
+	_dump(json_data, write, 0)
+
+def _dump(value, write, depth):
+	if type(value) is LazyDict:
+		write(b"{")
+		for number, (key, item) in enumerate(dict.items(value)):
+			if number:
+				write(b",")
+			write(_dumps(key))
+			write(b":")
+			data = value.verbatim(key)
+			if data is None:
+				data = _dumps(value[key])
+			write(data)
+		write(b"}")
+	elif type(value) is dict and depth < 2:
+		# The top level and "regions" are what hold the LazyDicts
+		write(b"{")
+		for number, (key, item) in enumerate(value.items()):
+			if number:
+				write(b",")
+			write(_dumps(key))
+			write(b":")
+			_dump(item, write, depth + 1)
+		write(b"}")
+	else:
+		write(_dumps(value))
@@ -0,0 +1,182 @@
+import copy
+
+class MapEdits:
+	""" Changes made in the map editor that haven't been written to json_data yet.
+	Resources and decorations are tracked per tile, buildings per RuntimeID, so apply() only touches what changed """
+	def __init__(self, map_grid, building_index):
+		self.map_grid = map_grid
+		self.building_index = building_index
+		# offset -> resource the tile had before it was first edited
+		self.dirty_tiles = {}
+		# offset -> decoration style the tile had before it was first edited
+		self.dirty_decorations = {}
+		# RuntimeID -> edited copy of the entity
+		self.entity_edits = {}
+
+	def __len__(self):
+		return len(self.dirty_tiles) + len(self.dirty_decorations) + len(self.entity_edits)
+
+	def set_resource(self, x, y, resource):
+		grid = self.map_grid
+		if not grid.in_bounds(x, y):
+			return False
+		offset = y * grid.width + x
+		current = grid.get_resource(x, y)
+		if current == resource:
+			return False
+		original = self.dirty_tiles.get(offset, current)
+		grid.set_resource(x, y, resource)
+		if original == resource:
+			# Back to what the save has, nothing to write
+			del self.dirty_tiles[offset]
+		else:
+			self.dirty_tiles[offset] = original
+		return True
+
+	def fill_resource(self, offsets, resource):
+		""" set_resource() for many tiles at once, offsets are y * width + x. Returns the offsets that changed """
+		grid = self.map_grid
+		code = grid.resource_palette.code_for(resource)
+		codes = grid.resource_codes
+		ids = grid.resource_palette.ids
+		dirty_tiles = self.dirty_tiles
+		changed = []
+		for offset in offsets:
+			current = codes[offset]
+			if current == code:
+				continue
+			original = dirty_tiles.get(offset, ids[current])
+			codes[offset] = code
+			if original == resource:
+				del dirty_tiles[offset]
+			else:
+				dirty_tiles[offset] = original
+			changed.append(offset)
+		return changed
+
+	def set_owner(self, handles, faction):
+		""" Hand the buildings with these handles to faction. Returns how many changed """
+		changed = 0
+		for handle in handles:
+			entity = self.building_index.entities[handle]
+			if entity is None or self.current(entity).get("FactionID") == faction:
+				continue
+			self.edit_entity(entity)["FactionID"] = faction
+			changed += 1
+		return changed
+
+	def set_decoration(self, x, y, style):
+		""" style is (kind, TileColor, MapColor) or None to take the decoration off """
+		grid = self.map_grid
+		if not grid.in_bounds(x, y):
+			return False
+		offset = y * grid.width + x
+		current = grid.get_decoration(x, y)
+		if current == style:
+			return False
+		original = self.dirty_decorations.get(offset, current)
+		grid.set_decoration(x, y, style)
+		if original == style:
+			del self.dirty_decorations[offset]
+		else:
+			self.dirty_decorations[offset] = original
+		return True
+
+	def current(self, entity):
+		""" The entity as the map editor sees it, with any pending edits """
+		if entity is None:
+			return None
+		runtime_id = entity.get("RuntimeID")
+		if runtime_id is None:
+			return entity
+		return self.entity_edits.get(runtime_id["ID"], entity)
+
+	def edit_entity(self, entity):
+		""" A copy of the entity that's safe to change. It's written back by apply() """
+		runtime_id = entity.get("RuntimeID")
+		if runtime_id is None:
+			# Can't find it again later without an ID, so edit it in place
+			return entity
+		edited = self.entity_edits.get(runtime_id["ID"])
+		if edited is None:
+			edited = copy.deepcopy(entity)
+			self.entity_edits[runtime_id["ID"]] = edited
+		return edited
+
+	def apply(self, region):
+		""" Write pending changes into a region of json_data. Returns (tiles written, entities written) """
+		grid = self.map_grid
+		resources = region["resources"]
+
+		# Group removals so each resource list is filtered at most once
+		removed = {}
+		added = []
+		for offset, original in self.dirty_tiles.items():
+			x = offset % grid.width
+			y = offset // grid.width
+			if original is not None:
+				removed.setdefault(original, set()).add((x, y))
+			current = grid.resource_palette.ids[grid.resource_codes[offset]]
+			if current is not None:
+				added.append((current, x, y))
+
+		# Changed lists are always new lists, never changed in place, so the undo journal can keep the old ones
+		for resource, tiles in removed.items():
+			resources[resource] = [tile for tile in resources.get(resource, []) if (tile["X"], tile["Y"]) not in tiles]
+			if not resources[resource]:
+				del resources[resource]
+		added_by_resource = {}
+		for resource, x, y in added:
+			added_by_resource.setdefault(resource, []).append({"X": x, "Y": y})
+		for resource, tiles in added_by_resource.items():
+			resources[resource] = resources.get(resource, []) + tiles
+
+		if self.dirty_decorations:
+			self.apply_decorations(region)
+
+		entities_written = 0
+		for runtime_id, edited in self.entity_edits.items():
+			handle = self.building_index.handle_for_runtime_id(runtime_id)
+			if not handle:
+				print(f"Entity {runtime_id} is gone, skipping its edits")
+				continue
+			# Update the dict the save holds rather than swapping it, the index and tree point at it
+			entity = self.building_index.entities[handle]
+			entities = region.get("entities", {}).get(entity.get("EntityID")) or ()
+			if not any(other is entity for other in entities):
+				# The index is out of step with the save, writing into this dict wouldn't change anything that's exported
+				print(f"Entity {runtime_id} is no longer in the save, skipping its edits")
+				continue
+			entity.clear()
+			entity.update(edited)
+			entities_written += 1
+
+		tiles_written = len(self.dirty_tiles) + len(self.dirty_decorations)
+		self.dirty_tiles = {}
+		self.dirty_decorations = {}
+		self.entity_edits = {}
+		return tiles_written, entities_written
+
+	def apply_decorations(self, region):
+		""" Same as the resources: only lists of a kind that changed are replaced, every other tile keeps its dict """
+		grid = self.map_grid
+		decorations = region.get("decorations")
+		if decorations is None:
+			decorations = region["decorations"] = {}
+		removed = {}
+		added_by_kind = {}
+		for offset, original in self.dirty_decorations.items():
+			x = offset % grid.width
+			y = offset // grid.width
+			if original is not None:
+				removed.setdefault(original[0], set()).add((x, y))
+			current = grid.decoration_palette.ids[grid.decoration_codes[offset]]
+			if current is not None:
+				kind, tile_color, map_color = current
+				added_by_kind.setdefault(kind, []).append({"TileColor": tile_color, "MapColor": map_color, "X": x, "Y": y})
+
+		# An emptied kind stays as an empty list rather than going missing
+		for kind, tiles in removed.items():
+			decorations[kind] = [tile for tile in decorations.get(kind, []) if (tile["X"], tile["Y"]) not in tiles]
+		for kind, tiles in added_by_kind.items():
+			decorations[kind] = decorations.get(kind, []) + tiles
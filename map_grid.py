@@ -0,0 +1,97 @@
+from array import array
+import reference as ref
+
+# Maps are 480x480 tiles, a tile is 5 world units
+MAP_SIZE = 480
+TILE_SIZE = 5
+
+class Palette:
+	""" Two-way lookup between ID strings and small integer codes. Code 0 always means empty """
+	def __init__(self, ids=()):
+		self.ids = [None]
+		self.codes = {None: 0}
+		for id in ids:
+			self.code_for(id)
+
+	def code_for(self, id):
+		code = self.codes.get(id)
+		if code is None:
+			code = len(self.ids)
+			self.ids.append(id)
+			self.codes[id] = code
+		return code
+
+	def id_for(self, code):
+		return self.ids[code]
+
+def unpack_color(value):
+	""" A save's packed 0xRRGGBBAA colour (stored as a signed int) as (red, green, blue, alpha) """
+	value &= 0xFFFFFFFF
+	return (value >> 24, (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+
+class MapGrid:
+	""" Resource, building and decoration of every tile, stored as flat integer arrays (index = y * width + x).
+	A decoration's palette ID is its style, (kind, TileColor, MapColor), a region only uses a handful of them """
+	def __init__(self, width=MAP_SIZE, height=MAP_SIZE):
+		self.width = width
+		self.height = height
+		self.resource_palette = Palette(ref.resource_list)
+		self.building_palette = Palette(ref.building_list)
+		self.resource_codes = array("H", bytes(2 * width * height))
+		self.building_codes = array("H", bytes(2 * width * height))
+		self.decoration_palette = Palette()
+		self.decoration_codes = array("H", bytes(2 * width * height))
+
+	def load_resources(self, region_resources):
+		for resource, tiles in region_resources.items():
+			for tile in tiles:
+				self.set_resource(tile["X"], tile["Y"], resource)
+
+	def load_decorations(self, region_decorations):
+		for kind, tiles in region_decorations.items():
+			for tile in tiles:
+				self.set_decoration(tile["X"], tile["Y"], (kind, tile.get("TileColor"), tile.get("MapColor")))
+
+	def paint_buildings(self, building_index):
+		""" Fill building codes from a SpatialIndex, so every tile a building covers shows it """
+		codes = self.building_codes
+		for offset, handle in enumerate(building_index.cells):
+			codes[offset] = self.building_palette.code_for(building_index.entities[handle]["EntityID"]) if handle else 0
+
+	def in_bounds(self, x, y):
+		return 0 <= x < self.width and 0 <= y < self.height
+
+	def get_resource(self, x, y):
+		if not self.in_bounds(x, y):
+			return None
+		return self.resource_palette.ids[self.resource_codes[y * self.width + x]]
+
+	def set_resource(self, x, y, resource):
+		if self.in_bounds(x, y):
+			self.resource_codes[y * self.width + x] = self.resource_palette.code_for(resource)
+
+	def get_building(self, x, y):
+		if not self.in_bounds(x, y):
+			return None
+		return self.building_palette.ids[self.building_codes[y * self.width + x]]
+
+	def set_building(self, x, y, building):
+		if self.in_bounds(x, y):
+			self.building_codes[y * self.width + x] = self.building_palette.code_for(building)
+
+	def get_decoration(self, x, y):
+		""" The (kind, TileColor, MapColor) on a tile, or None """
+		if not self.in_bounds(x, y):
+			return None
+		return self.decoration_palette.ids[self.decoration_codes[y * self.width + x]]
+
+	def set_decoration(self, x, y, style):
+		if self.in_bounds(x, y):
+			self.decoration_codes[y * self.width + x] = self.decoration_palette.code_for(style)
+
+	def decoration_style(self, kind):
+		""" The style a new decoration of kind gets: the first one of that kind the region has, else the game's default """
+		for style in self.decoration_palette.ids[1:]:
+			if style[0] == kind:
+				return style
+		return (kind, ref.default_tile_color, ref.default_map_color)
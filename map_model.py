@@ -0,0 +1,93 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
+from map_grid import MapGrid, unpack_color
+
+class MapTableModel(QAbstractTableModel):
+	""" Table model over a MapGrid. Nothing is created per cell, the view asks for what's on screen """
+	def __init__(self, icon_cache, parent=None):
+		super(MapTableModel, self).__init__(parent)
+		self.grid = MapGrid()
+		self.icon_cache = icon_cache
+		# Decorations are drawn as their MapColor under everything else when this is on
+		self.show_decorations = False
+		# decoration code -> QColor, codes are per grid so this goes with it
+		self.decoration_colors = {}
+
+	def set_grid(self, grid):
+		self.beginResetModel()
+		self.grid = grid
+		self.decoration_colors = {}
+		self.endResetModel()
+
+	def set_show_decorations(self, show):
+		if show == self.show_decorations:
+			return
+		self.show_decorations = show
+		# One change for the whole map, the view only repaints what's on screen
+		self.dataChanged.emit(self.index(0, 0), self.index(self.grid.height - 1, self.grid.width - 1))
+
+	def decoration_color(self, row, column):
+		""" The colour a cell's decoration is drawn in, or None if it has none or decorations are hidden """
+		if not self.show_decorations:
+			return None
+		code = self.grid.decoration_codes[row * self.grid.width + column]
+		if not code:
+			return None
+		color = self.decoration_colors.get(code)
+		if color is None:
+			color = self.decoration_colors[code] = QColor(*unpack_color(self.grid.decoration_palette.ids[code][2] or 0))
+		return color
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return self.grid.height
+
+	def columnCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+		return self.grid.width
+
+	def flags(self, index):
+		return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+	def tile_at(self, row, column):
+		""" (resource, building) at a cell, either can be None """
+		offset = row * self.grid.width + column
+		resource = self.grid.resource_palette.ids[self.grid.resource_codes[offset]]
+		building = self.grid.building_palette.ids[self.grid.building_codes[offset]]
+		return resource, building
+
+	def asset_at(self, row, column):
+		""" The ID whose image is drawn on a cell, buildings go on top of resources """
+		resource, building = self.tile_at(row, column)
+		if building is not None:
+			return building
+		return resource
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid():
+			return None
+		if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+			resource, building = self.tile_at(index.row(), index.column())
+			if building is not None:
+				return building[4:]
+			if resource is not None:
+				return resource[9:]
+			decoration = self.grid.get_decoration(index.column(), index.row())
+			if decoration is not None:
+				return decoration[0][5:]
+			return None
+		if role == Qt.DecorationRole:
+			asset = self.asset_at(index.row(), index.column())
+			if asset is not None:
+				return self.icon_cache.source(asset)
+		return None
+
+	def tile_changed(self, x, y):
+		index = self.index(y, x)
+		self.dataChanged.emit(index, index)
+
+	def tiles_changed(self, x0, y0, x1, y1):
+		""" One repaint for a whole edited area """
+		self.dataChanged.emit(self.index(y0, x0), self.index(y1, x1))
@@ -0,0 +1,64 @@
+from collections import deque
+import math
+
+# Multi-tile editing for the map. Each tool works out the tiles it covers as offsets (y * width + x),
+# then the edit goes through MapEdits as one batch, so filling 10000 tiles is one pass, one repaint and one write-back.
+
+def rectangle(grid, x0, y0, x1, y1):
+	""" Offsets of the inclusive rectangle, clipped to the map """
+	x0, x1 = sorted((x0, x1))
+	y0, y1 = sorted((y0, y1))
+	x0 = max(x0, 0)
+	x1 = min(x1, grid.width - 1)
+	offsets = []
+	for y in range(max(y0, 0), min(y1, grid.height - 1) + 1):
+		row = y * grid.width
+		offsets.extend(range(row + x0, row + x1 + 1))
+	return offsets
+
+def brush(grid, x, y, radius):
+	""" Offsets of a round brush centred on (x, y). Radius 0 is just that tile """
+	offsets = []
+	for dy in range(-radius, radius + 1):
+		if not 0 <= y + dy < grid.height:
+			continue
+		half = math.isqrt(radius * radius - dy * dy)
+		row = (y + dy) * grid.width
+		offsets.extend(range(row + max(x - half, 0), row + min(x + half, grid.width - 1) + 1))
+	return offsets
+
+def flood(codes, width, x, y, occupied=False):
+	""" Offsets of the tiles joined to (x, y) by their edges that have the same code in codes, or with occupied,
+	any non-zero code (e.g. every building in a base, whatever they are) """
+	size = len(codes)
+	start = y * width + x
+	if not (0 <= x < width and 0 <= start < size):
+		return []
+	target = codes[start]
+	if occupied and not target:
+		return []
+
+	def matches(offset):
+		return codes[offset] != 0 if occupied else codes[offset] == target
+
+	seen = bytearray(size)
+	seen[start] = 1
+	queue = deque([start])
+	found = []
+	while queue:
+		offset = queue.popleft()
+		found.append(offset)
+		column = offset % width
+		for neighbour, inside in ((offset - 1, column > 0), (offset + 1, column < width - 1), (offset - width, offset >= width), (offset + width, offset + width < size)):
+			if inside and not seen[neighbour] and matches(neighbour):
+				seen[neighbour] = 1
+				queue.append(neighbour)
+	return found
+
+def bounds(grid, offsets):
+	""" (x0, y0, x1, y1) around the offsets, or None if there aren't any """
+	if not offsets:
+		return None
+	width = grid.width
+	columns = [offset % width for offset in offsets]
+	return min(columns), min(offsets) // width, max(columns), max(offsets) // width
@@ -0,0 +1,192 @@
+from array import array
+from collections import OrderedDict
+from PySide6.QtCore import QRect
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+from PySide6.QtWidgets import QTableView
+from map_grid import unpack_color
+
+# The map is drawn from cached chunks of CHUNK_SIZE x CHUNK_SIZE tiles instead of cell by cell, and an edit only
+# redraws the chunks it touched. Zoomed out (cells under ICON_CELL_SIZE px) every tile is one pixel of an overview
+# image that's scaled up to the cell size. Zoomed in, chunks are pixmaps with the tile images on them.
+CHUNK_SIZE = 16
+ICON_CELL_SIZE = 10
+# Icon chunks are big (16 cells of 30 px is 480x480), so only this much of them is kept
+ICON_CHUNK_BUDGET_BYTES = 48 * 1024 * 1024
+
+class MapView(QTableView):
+	""" The map table with its cells painted from chunk caches. Selection, scrolling and signals are the table's own """
+	def __init__(self, parent=None):
+		super(MapView, self).__init__(parent)
+		# One 0xAARRGGBB pixel per tile, and the chunks of it that no longer match the grid
+		self.overview = None
+		self.stale_chunks = set()
+		# (chunk x, chunk y) -> QPixmap drawn at icon_cell_size, least recently used first
+		self.icon_chunks = OrderedDict()
+		self.icon_chunk_bytes = 0
+		self.icon_cell_size = None
+		# Colour of each palette code, rebuilt when a palette grows
+		self.color_tables = None
+		self.chunks_rendered = 0
+
+	def setModel(self, model):
+		super(MapView, self).setModel(model)
+		model.dataChanged.connect(self.invalidate_cells)
+		model.modelReset.connect(self.invalidate_all)
+		self.invalidate_all()
+
+	def cell_size(self):
+		return self.horizontalHeader().defaultSectionSize()
+
+	def invalidate_all(self):
+		self.overview = None
+		self.stale_chunks.clear()
+		self.color_tables = None
+		self.clear_icon_chunks()
+		self.viewport().update()
+
+	def clear_icon_chunks(self):
+		self.icon_chunks.clear()
+		self.icon_chunk_bytes = 0
+
+	def invalidate_cells(self, top_left, bottom_right, roles=()):
+		""" Only the chunks under the changed cells are drawn again """
+		chunks = self.chunks_in(top_left.column(), top_left.row(), bottom_right.column(), bottom_right.row())
+		self.stale_chunks.update(chunks)
+		for chunk in chunks:
+			pixmap = self.icon_chunks.pop(chunk, None)
+			if pixmap is not None:
+				self.icon_chunk_bytes -= pixmap.width() * pixmap.height() * 4
+		self.viewport().update()
+
+	def chunks_in(self, x0, y0, x1, y1):
+		return [(chunk_x, chunk_y) for chunk_y in range(max(y0, 0) // CHUNK_SIZE, max(y1, 0) // CHUNK_SIZE + 1) for chunk_x in range(max(x0, 0) // CHUNK_SIZE, max(x1, 0) // CHUNK_SIZE + 1)]
+
+	def background(self):
+		return self.viewport().palette().base().color().rgba()
+
+	def colors(self):
+		""" (resource, building, decoration) colour tables for the grid's palettes """
+		model = self.model()
+		grid = model.grid
+		sizes = (len(grid.resource_palette.ids), len(grid.building_palette.ids), len(grid.decoration_palette.ids))
+		if self.color_tables is None or self.color_tables[0] != sizes:
+			icon_cache = model.icon_cache
+			resource_colors = [0] + [icon_cache.color(id) for id in grid.resource_palette.ids[1:]]
+			building_colors = [0] + [icon_cache.color(id) for id in grid.building_palette.ids[1:]]
+			decoration_colors = [0] + [QColor(*unpack_color(style[2] or 0)[:3]).rgba() for style in grid.decoration_palette.ids[1:]]
+			self.color_tables = (sizes, resource_colors, building_colors, decoration_colors)
+		return self.color_tables[1:]
+
+	def render_overview_chunk(self, chunk_x, chunk_y):
+		""" Fill one chunk of the overview: building, else resource, else decoration (if shown), else background """
+		model = self.model()
+		grid = model.grid
+		resource_colors, building_colors, decoration_colors = self.colors()
+		show_decorations = model.show_decorations
+		background = self.background()
+		x0 = chunk_x * CHUNK_SIZE
+		x1 = min(x0 + CHUNK_SIZE, grid.width)
+		for y in range(chunk_y * CHUNK_SIZE, min((chunk_y + 1) * CHUNK_SIZE, grid.height)):
+			start = y * grid.width + x0
+			end = y * grid.width + x1
+			row = []
+			for resource, building, decoration in zip(grid.resource_codes[start:end], grid.building_codes[start:end], grid.decoration_codes[start:end]):
+				if building:
+					row.append(building_colors[building])
+				elif resource:
+					row.append(resource_colors[resource])
+				elif decoration and show_decorations:
+					row.append(decoration_colors[decoration])
+				else:
+					row.append(background)
+			self.overview[start:end] = array("I", row)
+		self.chunks_rendered += 1
+
+	def render_icon_chunk(self, chunk_x, chunk_y, cell_size):
+		model = self.model()
+		grid = model.grid
+		pixmap = QPixmap(CHUNK_SIZE * cell_size, CHUNK_SIZE * cell_size)
+		pixmap.fill(QColor.fromRgba(self.background()))
+		painter = QPainter(pixmap)
+		for y in range(chunk_y * CHUNK_SIZE, min((chunk_y + 1) * CHUNK_SIZE, grid.height)):
+			for x in range(chunk_x * CHUNK_SIZE, min((chunk_x + 1) * CHUNK_SIZE, grid.width)):
+				left = (x - chunk_x * CHUNK_SIZE) * cell_size
+				top = (y - chunk_y * CHUNK_SIZE) * cell_size
+				color = model.decoration_color(y, x)
+				if color is not None:
+					painter.fillRect(left, top, cell_size, cell_size, color)
+				asset = model.asset_at(y, x)
+				if asset is not None:
+					painter.drawPixmap(left, top, model.icon_cache.pixmap(asset, cell_size, cell_size))
+		painter.end()
+		self.chunks_rendered += 1
+		return pixmap
+
+	def icon_chunk(self, chunk, cell_size):
+		if cell_size != self.icon_cell_size:
+			self.clear_icon_chunks()
+			self.icon_cell_size = cell_size
+		pixmap = self.icon_chunks.get(chunk)
+		if pixmap is not None:
+			self.icon_chunks.move_to_end(chunk)
+			return pixmap
+		pixmap = self.render_icon_chunk(chunk[0], chunk[1], cell_size)
+		self.icon_chunks[chunk] = pixmap
+		self.icon_chunk_bytes += pixmap.width() * pixmap.height() * 4
+		while self.icon_chunk_bytes > ICON_CHUNK_BUDGET_BYTES and len(self.icon_chunks) > 1:
+			_, old = self.icon_chunks.popitem(last=False)
+			self.icon_chunk_bytes -= old.width() * old.height() * 4
+		return pixmap
+
+	def paintEvent(self, event):
+		model = self.model()
+		if model is None:
+			return
+		grid = model.grid
+		cell_size = self.cell_size()
+		left = self.horizontalOffset()
+		top = self.verticalOffset()
+		area = event.rect()
+		# Tiles under the area being painted
+		x0 = max((area.left() + left) // cell_size, 0)
+		y0 = max((area.top() + top) // cell_size, 0)
+		x1 = min((area.right() + left) // cell_size, grid.width - 1)
+		y1 = min((area.bottom() + top) // cell_size, grid.height - 1)
+
+		painter = QPainter(self.viewport())
+		painter.fillRect(area, QColor.fromRgba(self.background()))
+		if x0 <= x1 and y0 <= y1:
+			if cell_size < ICON_CELL_SIZE:
+				self.paint_overview(painter, cell_size, left, top, x0, y0, x1, y1)
+			else:
+				for chunk_x, chunk_y in self.chunks_in(x0, y0, x1, y1):
+					painter.drawPixmap(chunk_x * CHUNK_SIZE * cell_size - left, chunk_y * CHUNK_SIZE * cell_size - top, self.icon_chunk((chunk_x, chunk_y), cell_size))
+			self.paint_selection(painter, cell_size, left, top)
+		painter.end()
+
+	def paint_overview(self, painter, cell_size, left, top, x0, y0, x1, y1):
+		grid = self.model().grid
+		if self.overview is None:
+			self.overview = array("I", bytes(4 * grid.width * grid.height))
+			self.stale_chunks = set(self.chunks_in(0, 0, grid.width - 1, grid.height - 1))
+		for chunk in self.chunks_in(x0, y0, x1, y1):
+			if chunk in self.stale_chunks:
+				self.stale_chunks.discard(chunk)
+				self.render_overview_chunk(*chunk)
+		# QImage doesn't copy the bytes, so they're kept in a local until it's drawn
+		pixels = self.overview.tobytes()
+		image = QImage(pixels, grid.width, grid.height, grid.width * 4, QImage.Format_ARGB32)
+		# Scaled without smoothing, so each tile stays a sharp square
+		source = QRect(x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+		target = QRect(x0 * cell_size - left, y0 * cell_size - top, source.width() * cell_size, source.height() * cell_size)
+		painter.drawImage(target, image, source)
+
+	def paint_selection(self, painter, cell_size, left, top):
+		selection_model = self.selectionModel()
+		if selection_model is None:
+			return
+		color = self.palette().highlight().color()
+		color.setAlpha(120)
+		for selection_range in selection_model.selection():
+			painter.fillRect(selection_range.left() * cell_size - left, selection_range.top() * cell_size - top,
+				(selection_range.right() - selection_range.left() + 1) * cell_size, (selection_range.bottom() - selection_range.top() + 1) * cell_size, color)
@@ -0,0 +1,61 @@
+from PySide6.QtCore import Qt, QRect, Signal
+from PySide6.QtGui import QImage, QPainter, QPen, QTransform
+from PySide6.QtWidgets import QWidget
+
+class Minimap(QWidget):
+	""" Shows a region's PreviewImage over the map. Clicking or dragging on it emits the tile under the mouse """
+	tileClicked = Signal(int, int)
+
+	def __init__(self, parent=None):
+		super(Minimap, self).__init__(parent)
+		self.preview = None
+		self.image = None
+		self.view_rect = None
+		self.setCursor(Qt.PointingHandCursor)
+		self.setToolTip("Click to jump the map here")
+
+	def set_preview(self, preview):
+		self.preview = preview
+		if preview is None or not preview.columns:
+			self.image = None
+			self.setVisible(False)
+			return
+		# The buffer is stored x-major, so read it as rows of x and transpose to get x across
+		image = QImage(bytes(preview.pixels), preview.rows, preview.columns, preview.rows * 4, QImage.Format_RGBA8888)
+		self.image = image.transformed(QTransform(0, 1, 1, 0, 0, 0))
+		self.setVisible(True)
+		self.update()
+
+	def set_view_rect(self, x, y, width, height):
+		""" Outline the tiles the map view is showing """
+		self.view_rect = (x, y, width, height)
+		self.update()
+
+	def paintEvent(self, event):
+		if self.image is None:
+			return
+		painter = QPainter(self)
+		painter.drawImage(self.rect(), self.image)
+		if self.view_rect is not None:
+			origin_x, origin_y = self.preview.origin()
+			scale_x = self.width() / self.preview.columns
+			scale_y = self.height() / self.preview.rows
+			x, y, width, height = self.view_rect
+			painter.setPen(QPen(Qt.white, 1))
+			painter.drawRect(QRect(int((x - origin_x) * scale_x), int((y - origin_y) * scale_y), int(width * scale_x), int(height * scale_y)))
+		painter.setPen(QPen(Qt.black, 1))
+		painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+
+	def mousePressEvent(self, event):
+		self.emit_tile(event.position())
+
+	def mouseMoveEvent(self, event):
+		if event.buttons() & Qt.LeftButton:
+			self.emit_tile(event.position())
+
+	def emit_tile(self, position):
+		if self.preview is None:
+			return
+		pixel_x = min(max(int(position.x() * self.preview.columns / self.width()), 0), self.preview.columns - 1)
+		pixel_y = min(max(int(position.y() * self.preview.rows / self.height()), 0), self.preview.rows - 1)
+		self.tileClicked.emit(*self.preview.tile_for_pixel(pixel_x, pixel_y))
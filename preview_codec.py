@@ -0,0 +1,33 @@
+from map_grid import MAP_SIZE
+
+class PreviewImage:
+	""" A region's preview decoded into one packed RGBA buffer.
+	The save stores it as preview[x][y] = "#RRGGBBAA", one pixel per tile, centred on the middle of the map """
+	def __init__(self, columns, rows, pixels):
+		self.columns = columns
+		self.rows = rows
+		self.pixels = pixels
+
+	@classmethod
+	def decode(cls, preview):
+		columns = len(preview)
+		rows = len(preview[0]) if columns else 0
+		if any(len(column) != rows for column in preview):
+			raise ValueError("preview rows aren't all the same length")
+		# One hex string for the whole grid, so there's no per-pixel int or tuple
+		pixels = bytearray.fromhex("".join("".join(column) for column in preview).replace("#", ""))
+		if len(pixels) != columns * rows * 4:
+			raise ValueError("preview has a colour that isn't #RRGGBBAA")
+		return cls(columns, rows, pixels)
+
+	def get_pixel(self, x, y):
+		offset = (x * self.rows + y) * 4
+		return tuple(self.pixels[offset:offset + 4])
+
+	def origin(self):
+		""" Map tile under preview pixel (0, 0) """
+		return (MAP_SIZE - self.columns) // 2, (MAP_SIZE - self.rows) // 2
+
+	def tile_for_pixel(self, x, y):
+		origin_x, origin_y = self.origin()
+		return origin_x + x, origin_y + y
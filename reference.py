@@ -77,6 +77,16 @@ unit_list = [
     "vec_hammerhead"
 ]
 
+# Entities that move around, these don't get a spot on the map
+drone_list = [
+	"vec_cargo_drone",
+	"vec_builder_drone",
+	"vec_courier_drone",
+	"vec_fabricator_drone",
+	"vec_dark_builder_drone",
+	"vec_bullet"
+]
+
 resource_list = [
 	"resource_gold",
 	"resource_crystallite",
@@ -107,6 +117,17 @@ resource_list = [
 	"resource_abyss_core",
 ]
 
+# Floor tiles, stored per region under "decorations"
+decoration_list = [
+	"tile_enforced",
+	"tile_caution",
+	"tile_circular",
+]
+
+# TileColor and MapColor a new floor tile gets when the region has none of that kind to copy
+default_tile_color = -2080374529
+default_map_color = 1066119423
+
 building_list = [
 	"vec_storage",
 	"vec_wall",
@@ -139,6 +160,20 @@ building_list = [
 	"vec_generator"
 ]
 
+# Footprint in tiles (size x size) for buildings bigger than one tile.
+# Even sizes sit on a half tile, e.g. a foundry at PosX 1227.5 covers tiles 245 and 246
+building_sizes = {
+	"vec_foundry": 2,
+	"vec_generator": 2,
+	"vec_liquidator": 2,
+	"vec_artillery": 2,
+	"vec_laboratory": 2,
+	"vec_manufacturer": 3,
+	"vec_ammo_forge": 3,
+	"vec_core_assembler": 3,
+	"vec_decryptor": 3
+}
+
 all_techs = [
     "tech_main",
     "tech_cargo_port",
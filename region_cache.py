@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import reference as ref
+import instrument
+from map_grid import MapGrid
+from spatial_index import SpatialIndex
+from map_edits import MapEdits
+from preview_codec import PreviewImage
+
+# The map structures of a region are only built when it's first shown, and the least recently shown ones are
+# dropped again once they go over budget. They can always be rebuilt from json_data.
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Rough cost of one building in a SpatialIndex: its list slots, footprint tuple and RuntimeID entry
+BYTES_PER_BUILDING = 200
+
+class RegionView:
+	""" What the map editor needs for one region: tile grid (with decorations), building index, decoded preview and pending edits """
+	def __init__(self, region_id=None, map_grid=None, building_index=None, preview_image=None):
+		self.region_id = region_id
+		self.map_grid = map_grid if map_grid is not None else MapGrid()
+		self.building_index = building_index if building_index is not None else SpatialIndex()
+		self.preview_image = preview_image
+		self.map_edits = MapEdits(self.map_grid, self.building_index)
+
+	@classmethod
+	def build(cls, region_id, region, check_cancelled=None):
+		""" Only reads the region, so it's safe to call off the GUI thread """
+		map_grid = MapGrid()
+		resources = region.get("resources", {})
+		with instrument.span("index.resources", region=region_id) as args:
+			map_grid.load_resources(resources)
+			args["tiles"] = sum(len(tiles) for tiles in resources.values())
+		instrument.set_counter("resource tiles", args["tiles"])
+
+		building_index = SpatialIndex()
+		with instrument.span("index.buildings", region=region_id) as args:
+			for entity_id, entities in region.get("entities", {}).items():
+				if entity_id in ref.unit_list or entity_id in ref.drone_list:
+					continue
+				if check_cancelled is not None:
+					check_cancelled()
+				for building in entities:
+					building_index.add(building)
+			map_grid.paint_buildings(building_index)
+			args["buildings"] = len(building_index)
+
+		decorations = region.get("decorations") or {}
+		with instrument.span("index.decorations", region=region_id) as args:
+			map_grid.load_decorations(decorations)
+			args["tiles"] = sum(len(tiles) for tiles in decorations.values())
+
+		preview_image = None
+		if region.get("preview"):
+			with instrument.span("index.preview", region=region_id):
+				preview_image = PreviewImage.decode(region["preview"])
+		return cls(region_id, map_grid, building_index, preview_image)
+
+	def replace_entity_lists(self, replaced):
+		""" Bring the building index and grid in line after entity lists were swapped in json_data, by the bulk fixes
+		or by undo. replaced is (EntityID, list before, list now), a missing list can be anything that isn't a list.
+		Entities are matched by identity, so ones that stayed keep their handles. Returns the tile offsets that may have changed """
+		index = self.building_index
+		handles = None
+		changed = set()
+		for entity_id, before, now in replaced:
+			if entity_id in ref.unit_list or entity_id in ref.drone_list:
+				continue
+			if handles is None:
+				handles = {id(entity): handle for handle, entity in index.items()}
+			before = before if isinstance(before, list) else []
+			now = now if isinstance(now, list) else []
+			before_ids = {id(entity) for entity in before}
+			now_ids = {id(entity) for entity in now}
+			for entity in before:
+				if id(entity) not in now_ids and id(entity) in handles:
+					handle = handles.pop(id(entity))
+					changed.update(index.footprint_offsets(handle))
+					index.remove(handle)
+			for entity in now:
+				if id(entity) in before_ids:
+					continue
+				# Already indexed if it was changed in place, it may have moved
+				handle = handles.pop(id(entity), 0)
+				if handle:
+					changed.update(index.footprint_offsets(handle))
+					index.remove(handle)
+				handle = index.add(entity)
+				handles[id(entity)] = handle
+				changed.update(index.footprint_offsets(handle))
+
+		grid = self.map_grid
+		for offset in changed:
+			handle = index.cells[offset]
+			grid.building_codes[offset] = grid.building_palette.code_for(index.entities[handle]["EntityID"]) if handle else 0
+		return changed
+
+	def has_pending_edits(self):
+		""" Edits that only exist here and would be lost if the view was dropped """
+		return len(self.map_edits) > 0
+
+	def memory_bytes(self):
+		""" Roughly what the view holds on to. The arrays are exact, buildings are an estimate """
+		grid = self.map_grid
+		size = (len(grid.resource_codes) + len(grid.building_codes) + len(grid.decoration_codes)) * 2
+		size += len(self.building_index.cells) * self.building_index.cells.itemsize
+		size += len(self.building_index.entities) * BYTES_PER_BUILDING
+		if self.preview_image is not None:
+			size += len(self.preview_image.pixels)
+		return size
+
+class RegionCache:
+	""" Built RegionViews in least recently used order. Once they're over budget_bytes the oldest are dropped,
+	except the one being shown and any with edits that haven't been written back """
+	def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+		self.budget_bytes = budget_bytes
+		self.views = OrderedDict()
+		self.evictions = 0
+
+	def __contains__(self, region_id):
+		return region_id in self.views
+
+	def __len__(self):
+		return len(self.views)
+
+	def __iter__(self):
+		return iter(list(self.views.values()))
+
+	def get(self, region_id):
+		""" The view if it's built, or None. Counts as a use """
+		view = self.views.get(region_id)
+		if view is not None:
+			self.views.move_to_end(region_id)
+		return view
+
+	def peek(self, region_id):
+		""" Like get() without touching the order, for bookkeeping like undo """
+		return self.views.get(region_id)
+
+	def put(self, view):
+		self.views[view.region_id] = view
+		self.views.move_to_end(view.region_id)
+
+	def total_bytes(self):
+		return sum(view.memory_bytes() for view in self.views.values())
+
+	def set_budget(self, budget_bytes, keep=None):
+		self.budget_bytes = budget_bytes
+		return self.evict(keep)
+
+	def evict(self, keep=None):
+		""" Drop views, oldest first, until the rest fit. keep is the region being shown. Returns the dropped region ids """
+		dropped = []
+		total = self.total_bytes()
+		for region_id, view in list(self.views.items()):
+			if total <= self.budget_bytes:
+				break
+			if region_id == keep or view.has_pending_edits():
+				continue
+			total -= view.memory_bytes()
+			del self.views[region_id]
+			dropped.append(region_id)
+		self.evictions += len(dropped)
+		return dropped
+
+	def clear(self):
+		self.views.clear()
@@ -0,0 +1,228 @@
+""" What changed between two saves, without dumping them to text.
+
+python save_diff.py before.sav after.sav
+python save_diff.py before.sav after.sav --json changes.json
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+import save_io
+from entity_store import plain_type
+
+# Containers this close to the root get a Merkle hash built from their children's hashes, so a diff can skip
+# any region, entity list or resource list that hashes the same without looking inside it.
+# Anything deeper (single entities, preview columns...) is hashed from its serialized bytes in one go.
+MERKLE_DEPTH = 4
+
+# Entity lists are matched up by RuntimeID instead of by position
+ENTITY_SECTIONS = ("entities", "worldFeatures")
+
+def dump(value):
+	if save_io.orjson is not None:
+		return save_io.orjson.dumps(value)
+	return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+class SubtreeHasher:
+	""" Hashes of a document's subtrees, worked out once and kept by object id while the document is alive """
+	def __init__(self):
+		self.hashes = {}
+
+	def digest(self, value, depth=0):
+		if not isinstance(value, (dict, list)):
+			return hashlib.blake2b(dump(value), digest_size=16).digest()
+		key = id(value)
+		digest = self.hashes.get(key)
+		if digest is not None:
+			return digest
+		children = value.values() if isinstance(value, dict) else value
+		if depth >= MERKLE_DEPTH or not any(isinstance(child, (dict, list)) for child in children):
+			digest = hashlib.blake2b(dump(value), digest_size=16).digest()
+		else:
+			hasher = hashlib.blake2b(b"{" if isinstance(value, dict) else b"[", digest_size=16)
+			if isinstance(value, dict):
+				for child_key, child in value.items():
+					hasher.update(hashlib.blake2b(child_key.encode(), digest_size=16).digest())
+					hasher.update(self.digest(child, depth + 1))
+			else:
+				for child in value:
+					hasher.update(self.digest(child, depth + 1))
+			digest = hasher.digest()
+		self.hashes[key] = digest
+		return digest
+
+class Change:
+	""" One difference. kind is "added", "removed" or "changed", path is the keys down to it.
+	Entities in a path are written as "RuntimeID=<id>" so they can be found again whatever their position """
+	__slots__ = ("kind", "path", "old", "new")
+
+	def __init__(self, kind, path, old=None, new=None):
+		self.kind = kind
+		self.path = path
+		self.old = old
+		self.new = new
+
+	def to_dict(self):
+		change = {"kind": self.kind, "path": list(self.path)}
+		if self.kind != "added":
+			change["old"] = self.old
+		if self.kind != "removed":
+			change["new"] = self.new
+		return change
+
+def short(value, limit=80):
+	text = json.dumps(value, ensure_ascii=False)
+	return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def format_change(change):
+	path = "/".join(str(key) for key in change.path)
+	if change.kind == "added":
+		return f"+ {path} = {short(change.new)}"
+	if change.kind == "removed":
+		return f"- {path} (was {short(change.old)})"
+	return f"~ {path}: {short(change.old)} -> {short(change.new)}"
+
+def runtime_id(entity):
+	runtime = entity.get("RuntimeID") if isinstance(entity, dict) else None
+	if isinstance(runtime, dict):
+		return runtime.get("ID")
+	return None
+
+class SaveDiff:
+	""" Walks two documents side by side. Subtrees with the same hash are skipped without being looked at """
+	def __init__(self, old_data, new_data):
+		self.old_data = old_data
+		self.new_data = new_data
+		self.old_hashes = SubtreeHasher()
+		self.new_hashes = SubtreeHasher()
+		self.changes = []
+		self.skipped = 0
+
+	def run(self):
+		self.compare(self.old_data, self.new_data, ())
+		return self.changes
+
+	def same(self, old, new, depth):
+		if self.old_hashes.digest(old, depth) == self.new_hashes.digest(new, depth):
+			self.skipped += 1
+			return True
+		return False
+
+	def compare(self, old, new, path):
+		depth = len(path)
+		if plain_type(old) is not plain_type(new):
+			self.changes.append(Change("changed", path, old, new))
+			return
+		if not isinstance(old, (dict, list)):
+			if old != new:
+				self.changes.append(Change("changed", path, old, new))
+			return
+		if self.same(old, new, depth):
+			return
+
+		if isinstance(old, dict):
+			for key in old:
+				if key not in new:
+					self.changes.append(Change("removed", path + (key,), old=old[key]))
+			for key in new:
+				if key not in old:
+					self.changes.append(Change("added", path + (key,), new=new[key]))
+				else:
+					self.compare(old[key], new[key], path + (key,))
+		elif len(path) == 4 and path[0] == "regions" and path[2] in ENTITY_SECTIONS:
+			self.compare_entities(old, new, path)
+		elif len(path) == 4 and path[0] == "regions" and path[2] == "resources":
+			self.compare_tiles(old, new, path)
+		elif len(old) == len(new):
+			for position, (old_item, new_item) in enumerate(zip(old, new)):
+				self.compare(old_item, new_item, path + (position,))
+		elif all(isinstance(item, str) for item in old) and all(isinstance(item, str) for item in new):
+			# Lists of IDs like completedResearchTechs read better as what went in and what came out
+			old_items = set(old)
+			new_items = set(new)
+			for item in old:
+				if item not in new_items:
+					self.changes.append(Change("removed", path + (item,), old=item))
+			for item in new:
+				if item not in old_items:
+					self.changes.append(Change("added", path + (item,), new=item))
+		else:
+			self.changes.append(Change("changed", path, old, new))
+
+	def compare_entities(self, old, new, path):
+		old_by_id = {runtime_id(entity): entity for entity in old}
+		new_by_id = {runtime_id(entity): entity for entity in new}
+		if None in old_by_id or None in new_by_id or len(old_by_id) != len(old) or len(new_by_id) != len(new):
+			# Without unique RuntimeIDs there's nothing to match on, so compare position by position
+			if len(old) == len(new):
+				for position, (old_item, new_item) in enumerate(zip(old, new)):
+					self.compare(old_item, new_item, path + (position,))
+			else:
+				self.changes.append(Change("changed", path, old, new))
+			return
+		for entity_id, entity in old_by_id.items():
+			if entity_id not in new_by_id:
+				self.changes.append(Change("removed", path + (f"RuntimeID={entity_id}",), old=entity))
+		for entity_id, entity in new_by_id.items():
+			entity_path = path + (f"RuntimeID={entity_id}",)
+			if entity_id not in old_by_id:
+				self.changes.append(Change("added", entity_path, new=entity))
+			else:
+				self.compare(old_by_id[entity_id], entity, entity_path)
+
+	def compare_tiles(self, old, new, path):
+		""" Resource tiles are a set of positions, order in the list doesn't matter """
+		old_tiles = {(tile["X"], tile["Y"]) for tile in old}
+		new_tiles = {(tile["X"], tile["Y"]) for tile in new}
+		for x, y in sorted(old_tiles - new_tiles):
+			self.changes.append(Change("removed", path + (f"{x},{y}",), old={"X": x, "Y": y}))
+		for x, y in sorted(new_tiles - old_tiles):
+			self.changes.append(Change("added", path + (f"{x},{y}",), new={"X": x, "Y": y}))
+
+def diff_saves(old_data, new_data):
+	""" Returns (changes, subtrees skipped because they hashed the same) """
+	save_diff = SaveDiff(old_data, new_data)
+	changes = save_diff.run()
+	return changes, save_diff.skipped
+
+def summarize(changes):
+	""" How many changes of each kind there are under each top level key (or region) """
+	summary = {}
+	for change in changes:
+		area = "/".join(str(key) for key in change.path[:3]) if change.path[:1] == ("regions",) else str(change.path[0]) if change.path else "(root)"
+		counts = summary.setdefault(area, {"added": 0, "removed": 0, "changed": 0})
+		counts[change.kind] += 1
+	return summary
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Show what changed between two .sav files.")
+	parser.add_argument("old", help="the save before")
+	parser.add_argument("new", help="the save after")
+	parser.add_argument("--json", help="also write the full change list here as JSON")
+	parser.add_argument("--limit", type=int, default=200, help="most changes to print (default: 200, 0 for all)")
+	args = parser.parse_args(argv)
+
+	old_data, _ = save_io.load_save(args.old)
+	new_data, _ = save_io.load_save(args.new)
+	start = time.perf_counter()
+	changes, skipped = diff_saves(old_data, new_data)
+	diff_time = time.perf_counter() - start
+
+	shown = changes if args.limit == 0 else changes[:args.limit]
+	for change in shown:
+		print(format_change(change))
+	if len(shown) < len(changes):
+		print(f"... and {len(changes) - len(shown)} more")
+	print()
+	for area, counts in summarize(changes).items():
+		print(f"{area}: {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed")
+	print(f"{len(changes)} changes in {diff_time * 1000:.1f} ms, {skipped} identical subtrees skipped")
+
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as file:
+			json.dump([change.to_dict() for change in changes], file, ensure_ascii=False, indent=1)
+	return 0 if not changes else 1
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,100 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import entity_store
+import lazy_save
+
+# orjson is optional. If it's installed we use it to parse and dump, it's a good bit faster than the json module
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+def has_fast_parser():
+	return orjson is not None
+
+def load_save(file_path, fast=True, compact=False, lazy=False):
+	""" Read a .sav, gunzip it in memory and parse it. Returns (json_data, timings) where timings is seconds per phase.
+	compact shares repeated entity data to save memory (see entity_store), worth it for a save that stays open.
+	lazy leaves each region's big fields unparsed until they're read (see lazy_save) """
+	timings = {}
+
+	start = time.perf_counter()
+	with open(file_path, "rb") as file:
+		compressed = file.read()
+	timings["read"] = time.perf_counter() - start
+
+	start = time.perf_counter()
+	raw = gzip.decompress(compressed)
+	timings["decompress"] = time.perf_counter() - start
+	del compressed
+
+	start = time.perf_counter()
+	json_data = lazy_save.loads(raw, compact=compact) if lazy else None
+	if json_data is not None:
+		# Entities are compacted as they're parsed
+		compact = False
+	elif fast and orjson is not None:
+		json_data = orjson.loads(raw)
+	else:
+		json_data = json.loads(raw)
+	timings["parse"] = time.perf_counter() - start
+	del raw
+
+	if compact:
+		start = time.perf_counter()
+		entity_store.compact_entities(json_data)
+		timings["compact"] = time.perf_counter() - start
+
+	timings["total"] = sum(timings.values())
+	return json_data, timings
+
+def format_timings(timings):
+	return " | ".join(f"{phase}: {seconds * 1000:.1f} ms" for phase, seconds in timings.items())
+
+def export_save(json_data, file_path, compresslevel=6, compact=True, fast=True):
+	""" Serialize straight into a gzip stream next to file_path, then atomically swap it in. Returns timings like load_save """
+	timings = {}
+	target_dir = os.path.dirname(os.path.abspath(file_path))
+	fd, temp_path = tempfile.mkstemp(prefix=".vecedit_", suffix=".tmp", dir=target_dir)
+	try:
+		# mkstemp makes the file private, keep the permissions the old save had
+		if os.path.exists(file_path):
+			shutil.copymode(file_path, temp_path)
+		else:
+			os.chmod(temp_path, 0o644)
+
+		start = time.perf_counter()
+		with os.fdopen(fd, "wb") as file:
+			# No filename or timestamp in the gzip header, so the same data always gives the same file
+			with gzip.GzipFile(filename="", mode="wb", fileobj=file, compresslevel=compresslevel, mtime=0) as gz_file:
+				if compact and lazy_save.is_lazy(json_data):
+					# Copies whatever wasn't changed straight from what was loaded
+					lazy_save.dump(json_data, gz_file.write)
+				elif compact and fast and orjson is not None:
+					gz_file.write(orjson.dumps(json_data))
+				else:
+					with io.TextIOWrapper(gz_file, encoding="utf-8") as text_file:
+						if compact:
+							json.dump(json_data, text_file, separators=(",", ":"), ensure_ascii=False)
+						else:
+							json.dump(json_data, text_file, indent=4, ensure_ascii=False)
+			file.flush()
+			os.fsync(file.fileno())
+		timings["write"] = time.perf_counter() - start
+
+		start = time.perf_counter()
+		os.replace(temp_path, file_path)
+		timings["replace"] = time.perf_counter() - start
+	except BaseException:
+		# Leave the old save alone if anything went wrong
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
+		raise
+
+	timings["total"] = timings["write"] + timings["replace"]
+	return timings
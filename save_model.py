@@ -0,0 +1,388 @@
+import time
+import instrument
+import lazy_save
+import save_io
+import save_ops
+import snapshot_cache
+from region_cache import RegionView, RegionCache, DEFAULT_BUDGET_BYTES
+from entity_search import EntityIndex, entity_path
+from preview_codec import PreviewImage
+from undo_journal import Journal, MISSING, value_at_path
+
+# The core of the editor: loading, indexing, editing and exporting a save.
+# Nothing in here (or anything it imports) touches Qt, so batch.py and scripts start without paying for PySide6.
+
+# The map opens on this region if the save doesn't say which one is active
+MAP_REGION = "region_the_abyss"
+
+def default_region(json_data):
+	""" The region the map opens on: the one the player was in, else the first one """
+	regions = json_data.get("regions", {})
+	active = json_data.get("ActiveRegion")
+	if active in regions:
+		return active
+	if MAP_REGION in regions:
+		return MAP_REGION
+	return next(iter(regions), MAP_REGION)
+
+def index_entities(json_data, check_cancelled=None, region_id=None):
+	""" Builds the map view of one region (the active one by default) and a search index over that region.
+	Other regions are only indexed when they're first shown or searched. Pure Python so it can run on the load worker """
+	if region_id is None:
+		region_id = default_region(json_data)
+	view = RegionView.build(region_id, json_data["regions"][region_id], check_cancelled)
+	with instrument.span("index.search", region=region_id) as args:
+		entity_index = EntityIndex.build(json_data, check_cancelled, regions={region_id})
+		args["entities"] = len(entity_index)
+	instrument.set_counter("entities indexed", len(entity_index))
+	return view, entity_index
+
+def store_snapshot(file_path, key, directory, budget_bytes):
+	""" Load and index a save the way the window does and store it in the snapshot cache under key.
+	Runs in a process of its own (see workers.LoadWorker), so the window never waits on the pickle. Returns the snapshot's size """
+	try:
+		start = time.perf_counter()
+		# The file may have changed since the window hashed it, a snapshot of the new bytes would be under the wrong key
+		if snapshot_cache.hash_file(file_path) != key:
+			return 0
+		json_data, _ = save_io.load_save(file_path, compact=True, lazy=True)
+		indexes = index_entities(json_data)
+		size = snapshot_cache.SnapshotCache(directory, budget_bytes).store(key, (json_data, indexes))
+		print(f"Wrote snapshot ({size / (1024 * 1024):.1f} MB) in {(time.perf_counter() - start) * 1000:.0f} ms")
+		return size
+	except Exception as e:
+		# Only costs speed next time, the save itself was loaded fine by the window
+		print(f"Couldn't write snapshot: {type(e).__name__}: {e}")
+		return 0
+
+class SaveDocument:
+	""" One open save: the parsed json_data plus the indexes and pending map edits built from it.
+	Map structures are kept per region in region_views, the map_* properties are the ones for map_region """
+	def __init__(self, json_data=None, file_path=None, journal=None, region_budget_bytes=DEFAULT_BUDGET_BYTES):
+		self.json_data = json_data if json_data is not None else {}
+		self.file_path = file_path
+		# Every change made through the document goes in here so it can be undone
+		self.journal = journal if journal is not None else Journal()
+		self.region_views = RegionCache(region_budget_bytes)
+		self.map_region = None
+		# Stands in for the map region until something's indexed
+		self.empty_view = RegionView()
+		self.entity_index = EntityIndex()
+		self.indexed = False
+
+	@classmethod
+	def load(cls, file_path, fast=True, compact=False):
+		""" Read and parse a .sav. Returns (document, timings), the indexes aren't built yet.
+		compact is for a save that stays open, like the editor's (see entity_store) """
+		json_data, timings = save_io.load_save(file_path, fast=fast, compact=compact, lazy=True)
+		return cls(json_data, file_path), timings
+
+	def is_loaded(self):
+		return bool(self.json_data)
+
+	def region_ids(self):
+		return list(self.json_data.get("regions", {}))
+
+	def region(self, region_id=None):
+		if region_id is None:
+			region_id = self.map_region if self.map_region is not None else default_region(self.json_data)
+		return self.json_data["regions"][region_id]
+
+	@property
+	def view(self):
+		view = self.region_views.peek(self.map_region)
+		return view if view is not None else self.empty_view
+
+	@property
+	def map_grid(self):
+		return self.view.map_grid
+
+	@property
+	def building_index(self):
+		return self.view.building_index
+
+	@property
+	def map_edits(self):
+		return self.view.map_edits
+
+	@property
+	def preview_image(self):
+		return self.view.preview_image
+
+	def build_indexes(self, check_cancelled=None, region_id=None):
+		""" Only reads json_data and returns the result, so it's safe to call off the GUI thread """
+		return index_entities(self.json_data, check_cancelled, region_id)
+
+	def set_indexes(self, indexes):
+		# Views of other regions and their pending map edits belong to the old data, so they go too
+		view, self.entity_index = indexes
+		self.region_views.clear()
+		self.region_views.put(view)
+		self.map_region = view.region_id
+		self.indexed = True
+
+	def rebuild_entity_index(self):
+		""" After entities were taken out in bulk. Nothing to do if the indexes were never built, like in batch mode """
+		if self.indexed:
+			self.entity_index = EntityIndex.build(self.json_data, regions=self.entity_index.indexed_regions)
+
+	def index(self, check_cancelled=None, region_id=None):
+		self.set_indexes(self.build_indexes(check_cancelled, region_id))
+
+	def show_region(self, region_id):
+		""" Make region_id the map region, building its view the first time. Returns the view """
+		view = self.region_views.get(region_id)
+		if view is None:
+			with instrument.span("region.build", region=region_id):
+				view = RegionView.build(region_id, self.region(region_id))
+			self.region_views.put(view)
+			instrument.count("regions built")
+		self.map_region = region_id
+		self.make_searchable(region_id)
+		dropped = self.region_views.evict(keep=region_id)
+		if dropped:
+			print(f"Dropped map data for {', '.join(dropped)}")
+		instrument.set_counter("region view bytes", self.region_views.total_bytes())
+		return view
+
+	def set_region_budget(self, budget_bytes):
+		return self.region_views.set_budget(budget_bytes, keep=self.map_region)
+
+	def make_searchable(self, region_id=None):
+		""" Put region_id, or every region, in the search index if it isn't yet. Returns how many regions were added """
+		wanted = [region_id] if region_id is not None else self.region_ids()
+		missing = [other for other in wanted if other not in self.entity_index.indexed_regions]
+		for other in missing:
+			with instrument.span("index.search", region=other):
+				self.entity_index.add_region(other, self.region(other))
+		return len(missing)
+
+	def run_operation(self, name):
+		""" One of the save_ops bulk fixes by name. Returns how many things it changed """
+		return self.run_operations([name])[name]
+
+	def run_operations(self, names):
+		""" Several bulk fixes at once, the entity ones share a single pass. Returns {name: count} """
+		changes = []
+		# Entity lists are swapped whole by the filter, the other fixes replace top level values,
+		# so keeping the old references is all undo needs
+		top_level = {key: value for key, value in self.json_data.items() if key != "regions"}
+		with instrument.span("operations", names=list(names)) as args:
+			counts = save_ops.run_operations(self.json_data, names, lambda path, old, new: changes.append((path, old, new)))
+			args["counts"] = counts
+		for key in set(top_level) | set(self.json_data):
+			if key != "regions" and top_level.get(key, MISSING) is not self.json_data.get(key, MISSING):
+				changes.append(((key,), top_level.get(key, MISSING), self.json_data.get(key, MISSING)))
+		self.changed(self.journal.record(", ".join(names), changes))
+		if any(name in save_ops.RULES for name in names):
+			self.entity_lists_replaced(changes)
+			self.rebuild_entity_index()
+		return counts
+
+	def entity_lists_replaced(self, changes):
+		""" Update the built map views after entity lists were swapped in json_data. changes are (path, old, new) and can
+		go either way (undo swaps old back in), whichever one json_data holds now is taken as the current list.
+		Returns the ids of the regions whose map changed """
+		by_region = {}
+		for path, old, new in changes:
+			if len(path) == 4 and path[0] == "regions" and path[2] == "entities":
+				current = value_at_path(self.json_data, path)
+				previous = old if current is new else new
+				by_region.setdefault(path[1], []).append((path[3], previous, current))
+		changed = []
+		for region_id, replaced in by_region.items():
+			view = self.region_views.peek(region_id)
+			if view is not None and view.replace_entity_lists(replaced):
+				changed.append(region_id)
+		return changed
+
+	def apply_map_edits(self):
+		""" Write the map editor's pending changes in every region into json_data, as one undoable action.
+		Returns (tiles written, entities written) """
+		changes = []
+		tiles_written = 0
+		entities_written = 0
+		for view in self.region_views:
+			if len(view.map_edits):
+				tiles, entities = self.apply_region_edits(view, changes)
+				tiles_written += tiles
+				entities_written += entities
+		self.changed(self.journal.record("Map edits", changes))
+		return tiles_written, entities_written
+
+	def apply_region_edits(self, view, changes):
+		""" Write one region's pending map edits and add what changed to changes. Returns (tiles written, entities written) """
+		region_id = view.region_id
+		map_edits = view.map_edits
+		grid = view.map_grid
+		region = self.region(region_id)
+		dirty_tiles = [(offset % grid.width, offset // grid.width) for offset in map_edits.dirty_tiles]
+		resources_before = dict(region["resources"])
+		# Decorations are only read if they were edited, so an unedited region's stay unparsed
+		decorations_before = None
+		if map_edits.dirty_decorations:
+			decorations_before = region.get("decorations", MISSING)
+			decorations_before = dict(decorations_before) if decorations_before is not MISSING else MISSING
+		entities_before = []
+		for runtime_id in map_edits.entity_edits:
+			handle = view.building_index.handle_for_runtime_id(runtime_id)
+			if handle:
+				entity = view.building_index.entities[handle]
+				entities_before.append((entity, dict(entity)))
+		written = map_edits.apply(region)
+
+		# apply() swaps in new resource lists and new values for edited keys, so the old ones can be kept for undo
+		resources = region["resources"]
+		for resource in set(resources_before) | set(resources):
+			changes.append((("regions", region_id, "resources", resource), resources_before.get(resource, MISSING), resources.get(resource, MISSING)))
+		if decorations_before is MISSING:
+			changes.append((("regions", region_id, "decorations"), MISSING, region["decorations"]))
+		elif decorations_before is not None:
+			decorations = region["decorations"]
+			for kind in set(decorations_before) | set(decorations):
+				changes.append((("regions", region_id, "decorations", kind), decorations_before.get(kind, MISSING), decorations.get(kind, MISSING)))
+		for entity, before in entities_before:
+			path = entity_path(self.json_data, region_id, entity)
+			if path is None:
+				continue
+			for key in set(before) | set(entity):
+				changes.append(((*path, key), before.get(key, MISSING), entity.get(key, MISSING)))
+
+		# Keep the search index in step with what was just written
+		for x, y in dirty_tiles:
+			self.entity_index.set_resource_tile(region_id, x, y, grid.get_resource(x, y))
+		for entity, _ in entities_before:
+			entity_handle = self.entity_index.handle_for(entity)
+			if entity_handle:
+				self.entity_index.update(entity_handle)
+		return written
+
+	def set_values(self, label, values):
+		""" Change {path: value} in json_data as one undoable action """
+		action = self.changed(self.journal.set_values(self.json_data, label, values))
+		if action is not None:
+			self.entities_edited(action.paths())
+			self.previews_edited(action.paths())
+		return action
+
+	def record_changes(self, label, changes):
+		""" Journal (path, old value, new value) changes that were already made, e.g. by the manual editor """
+		action = self.changed(self.journal.record(label, changes))
+		if action is not None:
+			self.entity_lists_replaced(action.changes)
+			self.entities_edited(action.paths())
+			self.previews_edited(action.paths())
+		return action
+
+	def undo(self):
+		""" Returns the action that was undone, or None """
+		action = self.changed(self.journal.undo(self.json_data))
+		if action is not None:
+			self.refresh_after(action)
+		return action
+
+	def redo(self):
+		action = self.changed(self.journal.redo(self.json_data))
+		if action is not None:
+			self.refresh_after(action)
+		return action
+
+	def changed(self, action):
+		""" Tell lazily loaded regions what an action changed in place, so export doesn't copy the old bytes. Returns action """
+		if action is not None:
+			for path in action.paths():
+				lazy_save.mark_changed(self.json_data, path)
+		return action
+
+	def refresh_after(self, action):
+		""" Bring the indexes back in line after undo or redo changed json_data under them """
+		lists_changed = False
+		# region id -> tiles whose resource may have changed
+		changed_tiles = {}
+		changed_decorations = {}
+		for path, old, new in action.changes:
+			if len(path) == 4 and path[0] == "regions" and path[2] in ("entities", "worldFeatures"):
+				lists_changed = True
+			elif len(path) == 4 and path[0] == "regions" and path[2] == "resources":
+				tiles = changed_tiles.setdefault(path[1], set())
+				for value in (old, new):
+					if value is not MISSING:
+						tiles.update((tile["X"], tile["Y"]) for tile in value)
+			elif len(path) >= 3 and path[0] == "regions" and path[2] == "decorations":
+				tiles = changed_decorations.setdefault(path[1], set())
+				for value in (old, new):
+					if value is MISSING:
+						continue
+					# The whole decorations dict when it was added, else one kind's list
+					for tile_list in (value.values() if len(path) == 3 else [value]):
+						tiles.update((tile["X"], tile["Y"]) for tile in tile_list)
+
+		for region_id, tiles in changed_tiles.items():
+			current = {}
+			for path, _, _ in action.changes:
+				if len(path) == 4 and path[:3] == ("regions", region_id, "resources"):
+					value = value_at_path(self.json_data, path)
+					if value is not MISSING:
+						current.update(((tile["X"], tile["Y"]), path[3]) for tile in value)
+			# Tiles with a pending map edit keep it, the rest show what the save has now.
+			# Regions that aren't built or indexed pick it up from json_data when they are
+			view = self.region_views.peek(region_id)
+			searchable = region_id in self.entity_index.indexed_regions
+			for x, y in tiles:
+				if view is not None and y * view.map_grid.width + x not in view.map_edits.dirty_tiles:
+					view.map_grid.set_resource(x, y, current.get((x, y)))
+				if searchable:
+					self.entity_index.set_resource_tile(region_id, x, y, current.get((x, y)))
+
+		for region_id, tiles in changed_decorations.items():
+			view = self.region_views.peek(region_id)
+			if view is None:
+				continue
+			current = {}
+			decorations = value_at_path(self.json_data, ("regions", region_id, "decorations"))
+			if decorations is not MISSING:
+				for kind, tile_list in decorations.items():
+					current.update(((tile["X"], tile["Y"]), (kind, tile.get("TileColor"), tile.get("MapColor"))) for tile in tile_list)
+			for x, y in tiles:
+				if y * view.map_grid.width + x not in view.map_edits.dirty_decorations:
+					view.map_grid.set_decoration(x, y, current.get((x, y)))
+
+		if lists_changed:
+			# Undo swaps whole lists back, so the map views have to drop or pick up the entities that went or came back
+			self.entity_lists_replaced(action.changes)
+			self.rebuild_entity_index()
+		else:
+			self.entities_edited(action.paths())
+		self.previews_edited(action.paths())
+
+	def entities_edited(self, paths):
+		""" Re-index the entities under paths that were edited by hand, e.g. from the manual editor """
+		for path in paths:
+			if len(path) < 5 or path[0] != "regions" or path[2] != "entities":
+				continue
+			try:
+				entity = self.json_data["regions"][path[1]]["entities"][path[3]][path[4]]
+			except (KeyError, IndexError, TypeError):
+				continue
+			handle = self.entity_index.handle_for(entity)
+			if handle:
+				self.entity_index.update(handle)
+
+	def previews_edited(self, paths):
+		""" Decode the preview again in built regions whose preview was changed under paths, e.g. from the manual editor.
+		json_data is what gets exported, the decoded image only draws the minimap """
+		region_ids = {path[1] for path in paths if len(path) >= 3 and path[0] == "regions" and path[2] == "preview"}
+		for region_id in region_ids:
+			view = self.region_views.peek(region_id)
+			if view is None:
+				continue
+			preview = self.region(region_id).get("preview")
+			try:
+				view.preview_image = PreviewImage.decode(preview) if preview else None
+			except (ValueError, TypeError) as e:
+				print(f"Couldn't decode the preview of {region_id}: {e}")
+				view.preview_image = None
+
+	def export(self, file_path, compresslevel=6, compact=True):
+		""" Write the save out. Returns timings like save_io.export_save """
+		return save_io.export_save(self.json_data, file_path, compresslevel=compresslevel, compact=compact)
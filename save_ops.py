@@ -0,0 +1,45 @@
+import reference as ref
+from entity_filter import Rule, run_rules
+
+# Bulk fixes that work on a parsed save. No Qt in here, the GUI buttons and batch.py both call these.
+# Each one changes json_data in place and returns how many things it changed.
+# The entity fixes are entity_filter rules, so several of them can share one pass with run_operations().
+
+ENEMY_FACTIONS = frozenset(["faction_redscar"])
+
+RULES = {
+	"remove_enemy_units": Rule("remove_enemy_units", entity_ids=ref.unit_list, factions=ENEMY_FACTIONS),
+	"remove_enemy_buildings": Rule("remove_enemy_buildings", entity_ids=ref.building_list, factions=ENEMY_FACTIONS),
+	"remove_all_decryptors": Rule("remove_all_decryptors", entity_ids=["vec_decryptor"], section="worldFeatures"),
+}
+
+def remove_enemy_units(json_data):
+	return run_rules(json_data, [RULES["remove_enemy_units"]])["remove_enemy_units"]
+
+def remove_enemy_buildings(json_data):
+	return run_rules(json_data, [RULES["remove_enemy_buildings"]])["remove_enemy_buildings"]
+
+def unlock_all_research(json_data):
+	newly_unlocked = len(set(ref.all_techs) - set(json_data.get('completedResearchTechs', [])))
+	json_data['researchTechResources'] = []
+	json_data['completedResearchTechs'] = list(ref.all_techs)
+	return newly_unlocked
+
+def remove_all_decryptors(json_data):
+	return run_rules(json_data, [RULES["remove_all_decryptors"]])["remove_all_decryptors"]
+
+OPERATIONS = {
+	"remove_enemy_units": remove_enemy_units,
+	"remove_enemy_buildings": remove_enemy_buildings,
+	"unlock_all_research": unlock_all_research,
+	"remove_all_decryptors": remove_all_decryptors,
+}
+
+def run_operations(json_data, names, on_replace=None):
+	""" Run several operations, with all the entity ones done together in a single pass. Returns {name: count}
+	on_replace is passed on to run_rules() """
+	counts = run_rules(json_data, [RULES[name] for name in names if name in RULES], on_replace)
+	for name in names:
+		if name not in RULES:
+			counts[name] = OPERATIONS[name](json_data)
+	return {name: counts[name] for name in names}
@@ -0,0 +1,230 @@
+import gc
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import struct
+import sys
+from array import array
+import instrument
+
+# Parsed saves and the indexes built from them, kept on disk so opening the same save again skips the gunzip,
+# the parse, the compaction and the indexing. A snapshot is found by a hash of the .sav's bytes, so any change
+# to the file (or to SNAPSHOT_VERSION) simply misses.
+#
+# File layout, little endian:
+#   header     MAGIC, version, buffer count, offset and length of the pickle
+#   buffers    (typecode, offset, length) for each big array
+#   pickle     json_data and the indexes, with each big array replaced by its number in the buffer table
+#   arrays     raw array bytes, each aligned to BUFFER_ALIGNMENT, read straight out of a memory map
+#
+# Snapshots are pickles, so they're only ever read from the editor's own cache folder.
+
+MAGIC = b"VESNAP\x00\x00"
+# Bump this whenever anything that's pickled (json_data, RegionView, EntityIndex...) changes shape
+SNAPSHOT_VERSION = 3
+HEADER = struct.Struct("<8sIIQQ")
+BUFFER_ENTRY = struct.Struct("<4sQQ")
+BUFFER_ALIGNMENT = 64
+# Arrays smaller than this just go in the pickle
+MIN_BUFFER_BYTES = 64 * 1024
+SUFFIX = ".vesnap"
+
+DEFAULT_BUDGET_BYTES = 512 * 1024 * 1024
+
+def default_directory():
+	""" Per-user cache folder: %LOCALAPPDATA%\\VecEdit on Windows, ~/Library/Caches on macOS, XDG on Linux """
+	if sys.platform == "win32":
+		base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+		return os.path.join(base, "VecEdit", "snapshots")
+	if sys.platform == "darwin":
+		return os.path.expanduser("~/Library/Caches/VecEdit/snapshots")
+	base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+	return os.path.join(base, "vecedit", "snapshots")
+
+def hash_file(file_path):
+	""" The key a save's snapshot is stored under """
+	hasher = hashlib.blake2b(digest_size=20)
+	hasher.update(SNAPSHOT_VERSION.to_bytes(4, "little"))
+	with open(file_path, "rb") as file:
+		for block in iter(lambda: file.read(1024 * 1024), b""):
+			hasher.update(block)
+	return hasher.hexdigest()
+
+class _Pickler(pickle.Pickler):
+	""" Takes big arrays out of the pickle so they can be written as raw bytes """
+	def __init__(self, file, buffers):
+		super(_Pickler, self).__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+		self.buffers = buffers
+
+	def persistent_id(self, obj):
+		if isinstance(obj, array) and obj.itemsize * len(obj) >= MIN_BUFFER_BYTES:
+			self.buffers.append((obj.typecode, obj))
+			return len(self.buffers) - 1
+		if type(obj) is bytearray and len(obj) >= MIN_BUFFER_BYTES:
+			self.buffers.append(("=", obj))
+			return len(self.buffers) - 1
+		return None
+
+class _Unpickler(pickle.Unpickler):
+	""" Puts the arrays back from the memory-mapped file """
+	def __init__(self, file, mapped, table):
+		super(_Unpickler, self).__init__(file)
+		self.mapped = mapped
+		self.table = table
+
+	def persistent_load(self, number):
+		typecode, offset, length = self.table[number]
+		data = memoryview(self.mapped)[offset:offset + length]
+		try:
+			if typecode == "=":
+				return bytearray(data)
+			values = array(typecode)
+			values.frombytes(data)
+			return values
+		finally:
+			data.release()
+
+def write_snapshot(file_path, payload):
+	""" Pickle payload into a snapshot file. Written to a temporary file and renamed, so readers never see half of one """
+	buffers = []
+	pickled = io.BytesIO()
+	_Pickler(pickled, buffers).dump(payload)
+	pickled = pickled.getbuffer()
+
+	table_end = HEADER.size + BUFFER_ENTRY.size * len(buffers)
+	offset = _aligned(table_end + len(pickled))
+	entries = []
+	for typecode, values in buffers:
+		length = len(values) * (values.itemsize if isinstance(values, array) else 1)
+		entries.append(BUFFER_ENTRY.pack(typecode.encode(), offset, length))
+		offset = _aligned(offset + length)
+
+	temp_path = f"{file_path}.{os.getpid()}.tmp"
+	try:
+		with open(temp_path, "wb") as file:
+			file.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, len(buffers), table_end, len(pickled)))
+			file.writelines(entries)
+			file.write(pickled)
+			for _, values in buffers:
+				file.write(b"\0" * (_aligned(file.tell()) - file.tell()))
+				file.write(values)
+		os.replace(temp_path, file_path)
+	except BaseException:
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
+		raise
+	return os.path.getsize(file_path)
+
+def read_snapshot(file_path):
+	""" The payload stored by write_snapshot(). Raises ValueError if the file isn't a snapshot of this version """
+	with open(file_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+		magic, version, buffer_count, pickle_offset, pickle_length = HEADER.unpack_from(mapped, 0)
+		if magic != MAGIC or version != SNAPSHOT_VERSION:
+			raise ValueError(f"{file_path} isn't a version {SNAPSHOT_VERSION} snapshot")
+		table = []
+		for number in range(buffer_count):
+			typecode, offset, length = BUFFER_ENTRY.unpack_from(mapped, HEADER.size + number * BUFFER_ENTRY.size)
+			if offset + length > len(mapped):
+				raise ValueError(f"{file_path} is truncated")
+			table.append((typecode.rstrip(b"\0").decode(), offset, length))
+		# Nothing in a freshly loaded save is garbage, so don't let the collector walk it over and over as it's built
+		gc_was_enabled = gc.isenabled()
+		gc.disable()
+		try:
+			with memoryview(mapped)[pickle_offset:pickle_offset + pickle_length] as pickled:
+				return _Unpickler(io.BytesIO(pickled), mapped, table).load()
+		finally:
+			if gc_was_enabled:
+				gc.enable()
+
+def _aligned(offset):
+	return (offset + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * BUFFER_ALIGNMENT
+
+class SnapshotCache:
+	""" A folder of snapshots, capped at budget_bytes. Reading one counts as a use, the least recently used go first """
+	def __init__(self, directory=None, budget_bytes=DEFAULT_BUDGET_BYTES):
+		self.directory = directory or default_directory()
+		self.budget_bytes = budget_bytes
+
+	def enabled(self):
+		return self.budget_bytes > 0
+
+	def path_for(self, key):
+		return os.path.join(self.directory, key + SUFFIX)
+
+	def load(self, key):
+		""" The payload stored under key, or None """
+		if not self.enabled():
+			return None
+		path = self.path_for(key)
+		if not os.path.exists(path):
+			instrument.count("snapshot misses")
+			return None
+		try:
+			payload = read_snapshot(path)
+		except Exception as e:
+			# Old version, cut short by a crash... either way it's no use
+			print(f"Dropping snapshot {path}: {type(e).__name__}: {e}")
+			self.remove(path)
+			return None
+		# The modification time is the LRU order
+		os.utime(path)
+		instrument.count("snapshot hits")
+		return payload
+
+	def store(self, key, payload):
+		""" Write a snapshot and evict old ones to stay under budget. Returns the snapshot's size, 0 if it wasn't kept """
+		if not self.enabled():
+			return 0
+		os.makedirs(self.directory, exist_ok=True)
+		size = write_snapshot(self.path_for(key), payload)
+		self.evict(keep=key)
+		return size if os.path.exists(self.path_for(key)) else 0
+
+	def entries(self):
+		""" (modification time, size, path) of every snapshot, oldest first """
+		if not os.path.isdir(self.directory):
+			return []
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.endswith(SUFFIX):
+				path = os.path.join(self.directory, name)
+				try:
+					stat = os.stat(path)
+				except OSError:
+					continue
+				entries.append((stat.st_mtime, stat.st_size, path))
+		return sorted(entries)
+
+	def total_bytes(self):
+		return sum(size for _, size, _ in self.entries())
+
+	def evict(self, keep=None):
+		""" Remove the least recently used snapshots until the rest fit. keep is only removed if it's too big on its own """
+		entries = self.entries()
+		total = sum(size for _, size, _ in entries)
+		keep_path = self.path_for(keep) if keep is not None else None
+		removed = 0
+		for _, size, path in entries:
+			if total <= self.budget_bytes:
+				break
+			if path == keep_path and size <= self.budget_bytes:
+				continue
+			if self.remove(path):
+				total -= size
+				removed += 1
+		return removed
+
+	def remove(self, path):
+		try:
+			os.remove(path)
+			return True
+		except OSError:
+			# Another VecEdit might be reading it on Windows, it'll go next time
+			return False
+
+	def clear(self):
+		for _, _, path in self.entries():
+			self.remove(path)
@@ -0,0 +1,157 @@
+from array import array
+import math
+import reference as ref
+from map_grid import MAP_SIZE, TILE_SIZE
+
+def footprint(entity):
+	""" (x, y, size) of the tiles an entity covers. PosX/PosY is the centre of the building in world units """
+	size = ref.building_sizes.get(entity["EntityID"], 1)
+	# Small offset so float noise like 244.99999 still lands on the right tile
+	x = math.floor(float(entity["PosX"]) / TILE_SIZE - (size - 1) / 2 + 1e-6)
+	y = math.floor(float(entity["PosY"]) / TILE_SIZE - (size - 1) / 2 + 1e-6)
+	return x, y, size
+
+class SpatialIndex:
+	""" Occupancy grid of entity handles. Every tile a building covers points at it, stacked entities go in overflow """
+	def __init__(self, width=MAP_SIZE, height=MAP_SIZE):
+		self.width = width
+		self.height = height
+		# Handle 0 means empty, so both lists start with a placeholder
+		self.entities = [None]
+		self.footprints = [None]
+		self.cells = array("I", bytes(4 * width * height))
+		self.overflow = {}
+		self.by_runtime_id = {}
+		self.free_handles = []
+
+	def __len__(self):
+		return len(self.entities) - 1 - len(self.free_handles)
+
+	def _rect_offsets(self, x0, y0, x1, y1):
+		""" Offsets into cells for the inclusive rectangle, clipped to the map """
+		for cell_y in range(max(y0, 0), min(y1 + 1, self.height)):
+			row = cell_y * self.width
+			for cell_x in range(max(x0, 0), min(x1 + 1, self.width)):
+				yield row + cell_x
+
+	def _cell_offsets(self, x, y, size):
+		return self._rect_offsets(x, y, x + size - 1, y + size - 1)
+
+	def footprint_offsets(self, handle):
+		""" Offsets into cells of every tile the entity with this handle covers """
+		entity_footprint = self.footprints[handle]
+		return list(self._cell_offsets(*entity_footprint)) if entity_footprint is not None else []
+
+	def add(self, entity):
+		""" Index an entity and return its handle. The newest entity on a tile is the one at() returns """
+		if self.free_handles:
+			handle = self.free_handles.pop()
+			self.entities[handle] = entity
+			self.footprints[handle] = footprint(entity)
+		else:
+			handle = len(self.entities)
+			self.entities.append(entity)
+			self.footprints.append(footprint(entity))
+
+		cells = self.cells
+		for offset in self._cell_offsets(*self.footprints[handle]):
+			if cells[offset]:
+				self.overflow.setdefault(offset, []).append(cells[offset])
+			cells[offset] = handle
+
+		runtime_id = entity.get("RuntimeID")
+		if runtime_id is not None:
+			self.by_runtime_id[runtime_id["ID"]] = handle
+		return handle
+
+	def remove(self, handle):
+		entity = self.entities[handle]
+		if entity is None:
+			return None
+		cells = self.cells
+		for offset in self._cell_offsets(*self.footprints[handle]):
+			stacked = self.overflow.get(offset)
+			if cells[offset] == handle:
+				cells[offset] = stacked.pop() if stacked else 0
+			elif stacked and handle in stacked:
+				stacked.remove(handle)
+			if stacked is not None and not stacked:
+				del self.overflow[offset]
+
+		runtime_id = entity.get("RuntimeID")
+		if runtime_id is not None and self.by_runtime_id.get(runtime_id["ID"]) == handle:
+			del self.by_runtime_id[runtime_id["ID"]]
+		self.entities[handle] = None
+		self.footprints[handle] = None
+		self.free_handles.append(handle)
+		return entity
+
+	def move(self, handle, pos_x, pos_y):
+		""" Update an entity's position and re-index its footprint. Returns the new handle """
+		entity = self.remove(handle)
+		entity["PosX"] = float(pos_x)
+		entity["PosY"] = float(pos_y)
+		return self.add(entity)
+
+	def handle_at(self, x, y):
+		if not (0 <= x < self.width and 0 <= y < self.height):
+			return 0
+		return self.cells[y * self.width + x]
+
+	def at(self, x, y):
+		""" The entity on a tile, or None """
+		return self.entities[self.handle_at(x, y)]
+
+	def handles_at(self, x, y):
+		""" Every entity handle on a tile, topmost first """
+		handle = self.handle_at(x, y)
+		if not handle:
+			return []
+		return [handle] + self.overflow.get(y * self.width + x, [])[::-1]
+
+	def handles_in(self, offsets):
+		""" Handles of every entity on any of the tiles at offsets (y * width + x) """
+		cells = self.cells
+		found = {cells[offset] for offset in offsets}
+		if self.overflow:
+			for offset in set(offsets).intersection(self.overflow):
+				found.update(self.overflow[offset])
+		found.discard(0)
+		return sorted(found)
+
+	def handle_for_runtime_id(self, runtime_id):
+		return self.by_runtime_id.get(runtime_id, 0)
+
+	def query_rect(self, x0, y0, x1, y1):
+		""" Handles of every entity touching the inclusive tile rectangle (x0, y0)-(x1, y1) """
+		x0, x1 = sorted((x0, x1))
+		y0, y1 = sorted((y0, y1))
+		found = set()
+		if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.entities):
+			# Big box, cheaper to test every footprint than every tile
+			for handle, entity_footprint in enumerate(self.footprints):
+				if entity_footprint is None:
+					continue
+				x, y, size = entity_footprint
+				if x <= x1 and x + size - 1 >= x0 and y <= y1 and y + size - 1 >= y0:
+					found.add(handle)
+			return sorted(found)
+
+		# Slice whole rows out of the grid instead of visiting tiles one by one
+		cells = self.cells
+		clip_x0 = max(x0, 0)
+		clip_x1 = min(x1 + 1, self.width)
+		for cell_y in range(max(y0, 0), min(y1 + 1, self.height)):
+			row = cell_y * self.width
+			found.update(cells[row + clip_x0:row + clip_x1])
+		found.discard(0)
+		for offset, stacked in self.overflow.items():
+			if x0 <= offset % self.width <= x1 and y0 <= offset // self.width <= y1:
+				found.update(stacked)
+		return sorted(found)
+
+	def items(self):
+		""" (handle, entity) for every indexed entity """
+		for handle, entity in enumerate(self.entities):
+			if entity is not None:
+				yield handle, entity
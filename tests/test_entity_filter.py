@@ -0,0 +1,56 @@
+import os
+from collections import Counter
+import pytest
+import save_io
+from entity_filter import Rule, MODIFY, run_rules
+from save_model import SaveDocument
+
+EXAMPLE_SAVE = os.path.join(os.path.dirname(__file__), os.pardir, "com_example_save.sav")
+
+def factions(json_data):
+	return Counter(entity.get("FactionID") for region in json_data["regions"].values()
+		for entities in region["entities"].values() for entity in entities)
+
+def exported_factions(document, file_path):
+	document.export(str(file_path))
+	json_data, _ = save_io.load_save(str(file_path))
+	return factions(json_data)
+
+def flip_redscar(document, on_replace=None):
+	rule = Rule("flip", MODIFY, factions={"faction_redscar"}, modify=lambda entity: entity.__setitem__("FactionID", "faction_player"))
+	return run_rules(document.json_data, [rule], on_replace)
+
+@pytest.fixture
+def document():
+	# SaveDocument.load loads lazily, which is what these are about
+	document, _ = SaveDocument.load(EXAMPLE_SAVE)
+	return document
+
+def test_modify_on_lazy_load_is_exported(document, tmp_path):
+	before = factions(document.json_data)
+	assert before["faction_redscar"]
+	changes = []
+	counts = flip_redscar(document, lambda path, old, new: changes.append((path, old, new)))
+	assert counts == {"flip": before["faction_redscar"]}
+	assert changes
+	document.record_changes("flip", changes)
+
+	after = exported_factions(document, tmp_path / "flipped.sav")
+	assert after["faction_redscar"] == 0
+	assert after["faction_player"] == before["faction_player"] + before["faction_redscar"]
+
+def test_modify_without_on_replace_is_exported(document, tmp_path):
+	flip_redscar(document)
+	assert exported_factions(document, tmp_path / "flipped.sav")["faction_redscar"] == 0
+
+def test_modify_can_be_undone(document, tmp_path):
+	before = factions(document.json_data)
+	changes = []
+	flip_redscar(document, lambda path, old, new: changes.append((path, old, new)))
+	document.record_changes("flip", changes)
+	document.undo()
+	assert factions(document.json_data) == before
+	assert exported_factions(document, tmp_path / "undone.sav") == before
+
+	document.redo()
+	assert exported_factions(document, tmp_path / "redone.sav")["faction_redscar"] == 0
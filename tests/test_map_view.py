@@ -0,0 +1,151 @@
+import os
+import time
+import pytest
+
+pytest.importorskip("PySide6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QItemSelection, QItemSelectionModel
+from PySide6.QtWidgets import QApplication
+from PySide6.QtUiTools import QUiLoader
+import reference as ref
+import snapshot_cache
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+EXAMPLE_SAVE = os.path.join(REPO_DIR, "com_example_save.sav")
+
+# Offscreen smoke test of the map renderer: open a save through the window, zoom all the way out,
+# fill a selection and edit one tile, checking what actually gets painted each time
+
+@pytest.fixture(scope="module")
+def window():
+	import gui
+	# The window finds main_window.ui relative to the working directory
+	old_dir = os.getcwd()
+	os.chdir(REPO_DIR)
+	app = QApplication.instance() or QApplication([])
+	gui.loader = QUiLoader()
+	gui.app = app
+	window = gui.MainWindow()
+	window.ui.Tabs.setCurrentWidget(window.ui.MapTab)
+	window.show()
+	# No snapshots, so nothing is read from or written to the cache folder
+	window.snapshot_cache = snapshot_cache.SnapshotCache(budget_bytes=0)
+	window.start_load(file_path=EXAMPLE_SAVE)
+	deadline = time.perf_counter() + 60
+	while window.load_thread is not None and time.perf_counter() < deadline:
+		app.processEvents()
+	app.processEvents()
+	yield window
+	window.close()
+	os.chdir(old_dir)
+
+def painted(window, x, y):
+	""" The colour painted in the middle of tile (x, y), or None if it's off screen """
+	QApplication.processEvents()
+	view = window.ui.mapTable
+	image = view.viewport().grab().toImage()
+	cell_size = view.cell_size()
+	pixel_x = x * cell_size - view.horizontalOffset() + cell_size // 2
+	pixel_y = y * cell_size - view.verticalOffset() + cell_size // 2
+	if not (0 <= pixel_x < image.width() and 0 <= pixel_y < image.height()):
+		return None
+	return image.pixel(pixel_x, pixel_y)
+
+def expected(window, x, y):
+	""" What the overview should show for a tile, from the grid """
+	grid = window.document.map_grid
+	resource_colors, building_colors, _ = window.ui.mapTable.colors()
+	offset = y * grid.width + x
+	if grid.building_codes[offset]:
+		return building_colors[grid.building_codes[offset]]
+	if grid.resource_codes[offset]:
+		return resource_colors[grid.resource_codes[offset]]
+	return None
+
+def test_opens_and_paints(window):
+	view = window.ui.mapTable
+	assert window.document.indexed
+	assert window.map_model.grid is window.document.map_grid
+	painted(window, 0, 0)
+	assert view.chunks_rendered > 0
+
+def test_zooms_out_to_one_pixel(window):
+	grid = window.document.map_grid
+	sizes = []
+	while window.cell_size > 1:
+		window.zoom_out()
+		sizes.append(window.ui.mapTable.cell_size())
+		# Something from the grid is painted at every step, icons above 10 px and the overview below
+		painted(window, 0, 0)
+	assert sizes[-1] == 1
+	# At 1 px the whole map is on screen, one pixel per tile
+	buildings = [offset for offset, code in enumerate(grid.building_codes) if code][:20]
+	resources = [offset for offset, code in enumerate(grid.resource_codes) if code and not grid.building_codes[offset]][:20]
+	assert buildings and resources
+	for offset in buildings + resources:
+		x, y = offset % grid.width, offset // grid.width
+		color = painted(window, x, y)
+		if color is not None:
+			assert color == expected(window, x, y)
+
+def test_fill_selection_redraws(window):
+	view = window.ui.mapTable
+	grid = window.document.map_grid
+	# An empty 8x8 area, so the resource is what shows
+	x0, y0 = next((offset % grid.width, offset // grid.width) for offset in range(grid.width * grid.height)
+		if offset % grid.width < 100 and offset // grid.width < 100
+		and not any(grid.building_codes[(offset // grid.width + dy) * grid.width + offset % grid.width + dx] for dx in range(8) for dy in range(8)))
+	resource = window.ui.fillResourceInput.itemData(next(index for index in range(window.ui.fillResourceInput.count()) if window.ui.fillResourceInput.itemData(index)))
+	window.ui.fillResourceInput.setCurrentIndex(window.ui.fillResourceInput.findData(resource))
+	window.ui.fillOwnerInput.setCurrentIndex(0)
+	window.ui.toolInput.setCurrentIndex(window.ui.toolInput.findData("select"))
+	model = window.map_model
+	selection = QItemSelection(model.index(y0, x0), model.index(y0 + 7, x0 + 7))
+	view.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+	painted(window, x0, y0)
+	rendered = view.chunks_rendered
+	window.fill_selection()
+	view.selectionModel().clearSelection()
+	assert grid.get_resource(x0, y0) == resource
+	for x, y in ((x0, y0), (x0 + 7, y0 + 7)):
+		assert painted(window, x, y) == window.map_model.icon_cache.color(resource)
+	# Only the chunks under the filled area are drawn again
+	assert 0 < view.chunks_rendered - rendered <= 4
+
+def test_one_tile_edit_redraws_one_chunk(window):
+	view = window.ui.mapTable
+	grid = window.document.map_grid
+	x, y = next((offset % grid.width, offset // grid.width) for offset in range(grid.width * grid.height)
+		if not grid.building_codes[offset] and grid.resource_codes[offset])
+	painted(window, x, y)
+	rendered = view.chunks_rendered
+	window.selected_tile = (x, y)
+	window.ui.resourceInput.setPlainText("")
+	window.update_map_tile()
+	assert grid.get_resource(x, y) is None
+	assert painted(window, x, y) == view.background()
+	assert view.chunks_rendered - rendered == 1
+
+def test_zoomed_in_edit_redraws(window):
+	view = window.ui.mapTable
+	grid = window.document.map_grid
+	while window.cell_size < 30:
+		window.zoom_in()
+	view.scrollTo(window.map_model.index(0, 0))
+	painted(window, 0, 0)
+	assert (0, 0) in view.icon_chunks
+	# A tile in the top left chunk, given a resource it doesn't have yet
+	x, y = next((x, y) for y in range(8) for x in range(8) if not grid.building_codes[y * grid.width + x])
+	resource = next(resource for resource in ref.resource_list if resource != grid.get_resource(x, y))
+	window.selected_tile = (x, y)
+	window.ui.resourceInput.setPlainText(" ".join(resource.split("_")[1:]).title())
+	window.update_map_tile()
+	assert grid.get_resource(x, y) == resource
+	# The edited chunk is dropped from the icon cache and only it is drawn again on the next paint
+	assert (0, 0) not in view.icon_chunks
+	rendered = view.chunks_rendered
+	painted(window, x, y)
+	assert (0, 0) in view.icon_chunks
+	assert view.chunks_rendered - rendered == 1
+	assert view.icon_chunk_bytes <= 48 * 1024 * 1024
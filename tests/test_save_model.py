@@ -0,0 +1,32 @@
+import os
+import pytest
+from region_cache import RegionView
+from save_model import SaveDocument
+
+EXAMPLE_SAVE = os.path.join(os.path.dirname(__file__), os.pardir, "com_example_save.sav")
+
+@pytest.fixture
+def document():
+	document, _ = SaveDocument.load(EXAMPLE_SAVE)
+	document.index()
+	return document
+
+def assert_view_matches_save(document):
+	fresh = RegionView.build(document.map_region, document.region())
+	assert list(document.map_grid.building_codes) == list(fresh.map_grid.building_codes)
+	assert sorted(map(id, (entity for _, entity in document.building_index.items()))) == sorted(map(id, (entity for _, entity in fresh.building_index.items())))
+
+def test_bulk_removal_updates_the_map(document):
+	assert document.run_operation("remove_enemy_buildings")
+	assert not any(entity.get("FactionID") == "faction_redscar" for _, entity in document.building_index.items())
+	assert_view_matches_save(document)
+	document.undo()
+	assert_view_matches_save(document)
+	document.redo()
+	assert_view_matches_save(document)
+
+def test_edits_to_removed_buildings_are_not_written(document):
+	handle, _ = next((handle, entity) for handle, entity in document.building_index.items() if entity.get("FactionID") == "faction_redscar")
+	document.map_edits.set_owner([handle], "faction_player")
+	document.run_operation("remove_enemy_buildings")
+	assert document.apply_map_edits() == (0, 0)
@@ -0,0 +1,109 @@
+from collections import deque
+import entity_store
+
+# Undo/redo for json_data that only keeps what changed. An action is a label plus a list of
+# (path, old value, new value) changes, applied in order. Values are kept by reference, so replacing a
+# 5000 entity list costs one list of pointers, not a copy of the entities.
+
+class Missing:
+	""" Stands in for a key that wasn't there, undoing a change from MISSING deletes the key again """
+	def __repr__(self):
+		return "MISSING"
+
+MISSING = Missing()
+
+def get_at_path(data, path):
+	for key in path:
+		data = data[key]
+	return data
+
+def put_at_path(data, path, value):
+	container = entity_store.writable(data, path[:-1])
+	if value is MISSING:
+		del container[path[-1]]
+	else:
+		container[path[-1]] = value
+
+def value_at_path(data, path):
+	""" Like get_at_path, but MISSING if the last key isn't there """
+	container = get_at_path(data, path[:-1])
+	if isinstance(container, dict):
+		return container.get(path[-1], MISSING)
+	return container[path[-1]] if 0 <= path[-1] < len(container) else MISSING
+
+class Action:
+	__slots__ = ("label", "changes")
+
+	def __init__(self, label, changes):
+		self.label = label
+		self.changes = changes
+
+	def paths(self):
+		return [path for path, _, _ in self.changes]
+
+class Journal:
+	""" Undo and redo stacks of Actions. Only max_depth actions are kept, the oldest are dropped first """
+	def __init__(self, max_depth=50):
+		self.undo_stack = deque(maxlen=max_depth)
+		self.redo_stack = []
+
+	@property
+	def max_depth(self):
+		return self.undo_stack.maxlen
+
+	def set_max_depth(self, max_depth):
+		self.undo_stack = deque(self.undo_stack, maxlen=max_depth)
+
+	def record(self, label, changes):
+		""" Remember changes that have already been made to json_data. Anything that could be redone is gone now """
+		changes = [(tuple(path), old, new) for path, old, new in changes if old is not new]
+		if not changes:
+			return None
+		action = Action(label, changes)
+		self.undo_stack.append(action)
+		self.redo_stack.clear()
+		return action
+
+	def set_value(self, json_data, label, path, value):
+		""" Change one value and record it, for edits that aren't already made """
+		return self.set_values(json_data, label, {tuple(path): value})
+
+	def set_values(self, json_data, label, values):
+		""" Change {path: value} and record it as one action. Values that are already equal aren't recorded """
+		changes = []
+		for path, value in values.items():
+			old = value_at_path(json_data, path)
+			if old == value and type(old) is type(value):
+				continue
+			put_at_path(json_data, path, value)
+			changes.append((path, old, value))
+		return self.record(label, changes)
+
+	def can_undo(self):
+		return len(self.undo_stack) > 0
+
+	def can_redo(self):
+		return len(self.redo_stack) > 0
+
+	def undo(self, json_data):
+		""" Put the last action's old values back. Returns the action, or None if there's nothing to undo """
+		if not self.undo_stack:
+			return None
+		action = self.undo_stack.pop()
+		for path, old, _ in reversed(action.changes):
+			put_at_path(json_data, path, old)
+		self.redo_stack.append(action)
+		return action
+
+	def redo(self, json_data):
+		if not self.redo_stack:
+			return None
+		action = self.redo_stack.pop()
+		for path, _, new in action.changes:
+			put_at_path(json_data, path, new)
+		self.undo_stack.append(action)
+		return action
+
+	def clear(self):
+		self.undo_stack.clear()
+		self.redo_stack.clear()
@@ -0,0 +1,113 @@
+import multiprocessing
+import threading
+import time
+from PySide6.QtCore import QObject, QThread, Signal
+import save_io
+import save_model
+import snapshot_cache
+import instrument
+
+class LoadCancelled(Exception):
+	pass
+
+class LoadWorker(QObject):
+	""" Parses a save and builds the map indexes off the GUI thread. Give it a file_path to load, or json_data to only re-index.
+	With a snapshot_cache, a save that was opened before comes straight from its snapshot, and a new one gets a snapshot """
+	progress = Signal(str, int)
+	parsed = Signal(object)
+	indexed = Signal(object)
+	failed = Signal(str)
+	cancelled = Signal()
+	finished = Signal()
+
+	def __init__(self, index_function, file_path=None, json_data=None, snapshot_cache=None):
+		super(LoadWorker, self).__init__()
+		self.index_function = index_function
+		self.file_path = file_path
+		self.json_data = json_data
+		self.snapshot_cache = snapshot_cache
+		self.snapshot_key = None
+		self._cancel_requested = False
+
+	def cancel(self):
+		# Only sets a flag, the worker notices it between steps
+		self._cancel_requested = True
+
+	def check_cancelled(self):
+		if self._cancel_requested:
+			raise LoadCancelled()
+
+	def run(self):
+		# So the thread has a name in exported traces
+		threading.current_thread().name = "LoadWorker"
+		try:
+			indexes = None
+			if self.file_path is not None:
+				indexes = self.read_snapshot()
+				if indexes is None:
+					self.progress.emit("Reading save...", 5)
+					with instrument.span("load.read_parse", file=self.file_path) as args:
+						self.json_data, timings = save_io.load_save(self.file_path, compact=True, lazy=True)
+						args.update({phase: round(seconds * 1000, 1) for phase, seconds in timings.items()})
+					print(f"Parsed save | {save_io.format_timings(timings)}")
+				self.check_cancelled()
+			self.parsed.emit(self.json_data)
+
+			if indexes is None:
+				self.progress.emit("Indexing entities...", 40)
+				start = time.perf_counter()
+				with instrument.span("load.index"):
+					indexes = self.index_function(self.json_data, self.check_cancelled)
+				print(f"Indexed entities in {(time.perf_counter() - start) * 1000:.1f} ms")
+				self.check_cancelled()
+				self.indexed.emit(indexes)
+				self.write_snapshot()
+			else:
+				self.indexed.emit(indexes)
+		except LoadCancelled:
+			self.cancelled.emit()
+		except Exception as e:
+			self.failed.emit(f"{type(e).__name__}: {e}")
+		self.finished.emit()
+
+	def read_snapshot(self):
+		""" The indexes from this save's snapshot, with json_data set from it too. None if there isn't one """
+		if self.snapshot_cache is None or not self.snapshot_cache.enabled():
+			return None
+		self.progress.emit("Looking for a snapshot...", 2)
+		start = time.perf_counter()
+		with instrument.span("load.snapshot_read", file=self.file_path) as args:
+			self.snapshot_key = snapshot_cache.hash_file(self.file_path)
+			snapshot = self.snapshot_cache.load(self.snapshot_key)
+			args["hit"] = snapshot is not None
+		if snapshot is None:
+			return None
+		print(f"Opened from snapshot in {(time.perf_counter() - start) * 1000:.1f} ms")
+		self.json_data, indexes = snapshot
+		return indexes
+
+	def write_snapshot(self):
+		""" Start a separate process that loads the save again and stores its snapshot.
+		Pickling a big save takes seconds and holds the GIL the whole time, in here that would freeze the window.
+		The process gets the file path, not the data, so nothing is pickled on this side and the window can go on
+		changing the save. It isn't a daemon, so closing the editor lets it finish rather than leaving half a snapshot """
+		if self.snapshot_key is None:
+			return
+		try:
+			with instrument.span("load.snapshot_start"):
+				context = multiprocessing.get_context("spawn")
+				process = context.Process(target=save_model.store_snapshot, name="VecEditSnapshot",
+					args=(self.file_path, self.snapshot_key, self.snapshot_cache.directory, self.snapshot_cache.budget_bytes))
+				process.start()
+		except Exception as e:
+			# Only costs speed next time, the save itself is loaded fine
+			print(f"Couldn't start writing a snapshot: {type(e).__name__}: {e}")
+
+def start_worker(worker):
+	""" Moves the worker onto a new QThread and starts it. Keep references to both until the thread's finished signal """
+	thread = QThread()
+	worker.moveToThread(thread)
+	thread.started.connect(worker.run)
+	worker.finished.connect(thread.quit)
+	thread.start()
+	return thread